@@ -1,4 +1,5 @@
-import requests
+from provider_http import http_get
+import rxnorm_mirror
 import tkinter as tk
 from tkinter import messagebox, ttk
 import sqlite3
@@ -36,7 +37,15 @@ RXNORM_API_URL = "https://rxnav.nlm.nih.gov/REST/drugs.json?name="
 # Fetch medicine names from RxNorm
 def get_medicines(illness_name):
     try:
-        response = requests.get(RXNORM_API_URL + illness_name)
+        # Answer from the local RxNorm mirror when one has been imported
+        if rxnorm_mirror.mirror_available():
+            medicines = rxnorm_mirror.find_drugs(illness_name, 5)
+            if not medicines:
+                return ["No medicines found"], []
+            links = [f"https://mor.nlm.nih.gov/RxNav/search?searchBy=0&searchTerm={med}" for med in medicines]
+            return medicines, links
+
+        response = http_get(RXNORM_API_URL + illness_name)
         data = response.json()
 
         if "drugGroup" in data and "conceptGroup" in data["drugGroup"]:
@@ -1,7 +1,8 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
 import sqlite3
-import requests
+from provider_http import http_get
+import rxnorm_mirror
 import webbrowser
 import matplotlib.pyplot as plt
 from threading import Thread
@@ -83,9 +84,12 @@ ILLNESS_DATABASE = {
 
 # --------------------------- MEDICINE LOOKUP FUNCTION --------------------------- #
 def get_medicines_for_disease(disease):
-    """Fetch medicines using RxNorm API"""
+    """Fetch medicines from the local RxNorm mirror, or the RxNorm API if there is none"""
+    if rxnorm_mirror.mirror_available():
+        return rxnorm_mirror.find_drugs(disease, 3) or ["No medicines found"]
+
     base_url = "https://rxnav.nlm.nih.gov/REST/drugs.json?name="
-    response = requests.get(base_url + disease)
+    response = http_get(base_url + disease)
 
     if response.status_code == 200:
         data = response.json()
@@ -1,15 +1,16 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
 import time
-import spacy
 import sqlite3
-import requests
 import webbrowser
-from duckduckgo_search import DDGS
 from threading import Thread
+import symptom_engine
+from symptom_engine import load_illness_database
+from kb_store import open_illness_database, watch_illness_database
+from medicine_providers import find_medicines, warm_medicine_cache
 
-# Load NLP model
-nlp = spacy.load("en_core_web_sm")
+# Only the tokenizer is needed to match symptom phrases
+symptom_engine.set_extraction_profile("tokenizer")
 
 # Initialize SQLite Database
 conn = sqlite3.connect("users.db")
@@ -35,61 +36,41 @@ if not cursor.fetchone():
     cursor.execute("INSERT INTO admin (username) VALUES ('admin')")
     conn.commit()
 
-# Predefined illnesses
-ILLNESS_DATABASE = {
-    "cold": {
-        "symptoms": ["cough", "sneezing", "runny nose", "sore throat"],
-        "search_query": "best medicine for cold site:healthline.com OR site:webmd.com OR site:mayoclinic.org"
-    },
-    "flu": {
-        "symptoms": ["fever", "chills", "body ache", "fatigue"],
-        "search_query": "best medicine for flu site:healthline.com OR site:webmd.com OR site:mayoclinic.org"
-    },
-    "migraine": {
-        "symptoms": ["headache", "nausea", "light sensitivity"],
-        "search_query": "best medicine for migraine site:healthline.com OR site:webmd.com OR site:mayoclinic.org"
-    }
-}
+# Illnesses come from illnesses.db, recompiled from illnesses.json whenever that file is edited
+ILLNESS_DATABASE = open_illness_database()
 
+# Compile the symptom phrase index once for this database
+load_illness_database(ILLNESS_DATABASE)
 
-# Extract symptoms from user input
-def extract_symptoms(user_text):
-    doc = nlp(user_text.lower())
-    return [token.text for token in doc if token.text in sum([d["symptoms"] for d in ILLNESS_DATABASE.values()], [])]
+# Pick up edits to the illness data without restarting the kiosk
+watch_illness_database()
 
+# How many candidate illnesses to show under the diagnosis
+TOP_K = 3
 
-# Diagnose illness
-def diagnose(symptoms):
-    matched_illness = None
-    best_match_count = 0
-    search_query = None
+# Wait this long after the last keystroke before re-ranking as the user types
+LIVE_DIAGNOSIS_DELAY_MS = 150
 
-    for illness, data in ILLNESS_DATABASE.items():
-        common_symptoms = set(symptoms).intersection(data["symptoms"])
-        if len(common_symptoms) > best_match_count:
-            best_match_count = len(common_symptoms)
-            matched_illness = illness
-            search_query = data["search_query"]
 
-    return matched_illness, search_query
+# Extract symptoms from user input
+def extract_symptoms(user_text):
+    return symptom_engine.extract_symptoms(user_text)
 
 
-# Use DuckDuckGo to fetch medicine names
-def search_medicines(query):
-    try:
-        medicines = []
-        links = []
-        with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=3))
-            for res in results:
-                medicines.append(res["title"])
-                links.append(res["href"])
+# Diagnose illness: best candidate first, with the ranked candidates for the differential
+def diagnose(symptoms):
+    # One snapshot for the whole diagnosis, in case the database is reloaded meanwhile
+    kb = symptom_engine.get_knowledge_base()
+    ranked = symptom_engine.diagnose_topk(symptoms, TOP_K, kb=kb)
+    if not ranked:
+        return None, None, []
+    illness = ranked[0][0]
+    return illness, kb.database[illness], ranked
 
-        return medicines, links if medicines else (["No specific medicines found"], [])
 
-    except Exception as e:
-        print(f"Error fetching medicines: {e}")
-        return ["Error fetching medicines"], []
+# Ranked candidate illnesses as text, e.g. "Flu 75% · Cold 14%"
+def format_differential(ranked):
+    return " · ".join(f"{name.capitalize()} {score:.0%}" for name, score in ranked)
 
 
 # Open medicine source in browser
@@ -120,11 +101,15 @@ def get_diagnosis():
     if not symptoms:
         result_text = "❌ No recognizable symptoms found. Please describe your condition more clearly."
     else:
-        illness, search_query = diagnose(symptoms)
-        if illness and search_query:
-            medicines, links = search_medicines(search_query)
+        illness, data, ranked = diagnose(symptoms)
+        if illness:
+            medicines, links, stale = find_medicines(illness, data.get("search_query"),
+                                                     search_url=data.get("search_url"))
+            # Sources are failing, so these come from an earlier lookup
+            note = " (saved earlier, may be out of date)" if stale else ""
 
-            result_text = f"\n🩺 Diagnosis: {illness.capitalize()}\n\n💊 Recommended Medicines:\n"
+            result_text = (f"\n🩺 Diagnosis: {illness.capitalize()}\n"
+                           f"📋 Possible: {format_differential(ranked)}\n\n💊 Recommended Medicines{note}:\n")
 
             # Display medicine names as text
             medicine_names_text = "\n".join(f"➡ {med}" for med in medicines)
@@ -143,6 +128,28 @@ def get_diagnosis():
     Thread(target=typing_effect, args=(result_text, result_label)).start()
 
 
+# Debounce keystrokes: keep at most one pending live update, restarting the delay on every key
+def schedule_live_diagnosis(event=None):
+    global live_after_id
+    if live_after_id is not None:
+        root.after_cancel(live_after_id)
+    live_after_id = root.after(LIVE_DIAGNOSIS_DELAY_MS, live_diagnosis)
+
+
+# Re-rank candidate illnesses for the text typed so far
+def live_diagnosis():
+    global live_after_id
+    live_after_id = None
+    # Never block the event loop waiting for the NLP model or the phrase and typo indexes;
+    # try again once they are built
+    if not symptom_engine.nlp_ready() or not symptom_engine.get_knowledge_base().ready():
+        schedule_live_diagnosis()
+        return
+
+    ranked = live_session.update(entry.get())
+    live_label.config(text=f"📋 {format_differential(ranked)}" if ranked else "")
+
+
 # Store user symptoms
 def save_user_symptoms(username, symptoms):
     cursor.execute("UPDATE users SET symptoms = ? WHERE username = ?", (symptoms, username))
@@ -197,7 +204,8 @@ def login():
 
 # Main UI
 def main_app():
-    global root, entry, result_label, medicine_buttons_frame, medicine_list_label
+    global root, entry, result_label, medicine_buttons_frame, medicine_list_label, live_label, live_session, \
+        live_after_id
 
     root = tk.Tk()
     root.title("🩺 Symptom Checker")
@@ -210,6 +218,13 @@ def main_app():
     entry = tk.Entry(root, width=50, font=("Arial", 12))
     entry.pack(pady=5)
 
+    # Live ranking while typing
+    live_session = symptom_engine.DiagnosisSession(TOP_K)
+    live_after_id = None
+    live_label = tk.Label(root, text="", font=("Arial", 10), fg="gray", bg="#f0f8ff")
+    live_label.pack()
+    entry.bind("<KeyRelease>", schedule_live_diagnosis)
+
     submit_button = tk.Button(root, text="🔍 Diagnose", command=get_diagnosis, font=("Arial", 12), bg="#4caf50",
                               fg="white")
     submit_button.pack(pady=10)
@@ -245,4 +260,10 @@ tk.Button(login_window, text="Create Account", command=create_account).pack(pady
 new_user_entry = tk.Entry(login_window)
 new_user_entry.pack(pady=5)
 
+# Load the NLP model and build the phrase/typo indexes while the user is at the login screen
+symptom_engine.warm_nlp_in_background()
+Thread(target=symptom_engine.get_knowledge_base().warm, daemon=True).start()
+# Fill the medicine cache for every illness so diagnoses do not wait on the network
+Thread(target=warm_medicine_cache, daemon=True).start()
+
 login_window.mainloop()
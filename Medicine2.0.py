@@ -1,10 +1,10 @@
 import tkinter as tk
 import time
-import spacy
 from threading import Thread
+from symptom_engine import get_nlp, warm_nlp_in_background
 
-# Load NLP model
-nlp = spacy.load("en_core_web_sm")
+# Load NLP model in the background so the window opens right away
+warm_nlp_in_background()
 
 # Predefined symptoms and illnesses
 ILLNESS_DATABASE = {
@@ -28,7 +28,7 @@ ILLNESS_DATABASE = {
 
 # Function to extract symptoms from user input
 def extract_symptoms(user_text):
-    doc = nlp(user_text.lower())  # Process text with NLP
+    doc = get_nlp()(user_text.lower())  # Process text with NLP
     extracted_symptoms = [token.text for token in doc if token.text in sum([d["symptoms"] for d in ILLNESS_DATABASE.values()], [])]
     return extracted_symptoms
 
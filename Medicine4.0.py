@@ -1,14 +1,14 @@
 import tkinter as tk
 from tkinter import messagebox
 import time
-import spacy
 import sqlite3
-import requests
+from provider_http import http_get
 from bs4 import BeautifulSoup
 from threading import Thread
+from symptom_engine import get_nlp, warm_nlp_in_background
 
-# Load NLP model
-nlp = spacy.load("en_core_web_sm")
+# Load NLP model in the background so the window opens right away
+warm_nlp_in_background()
 
 # Initialize SQLite Database
 conn = sqlite3.connect("users.db")
@@ -41,7 +41,7 @@ ILLNESS_DATABASE = {
 
 # Function to extract symptoms from user input
 def extract_symptoms(user_text):
-    doc = nlp(user_text.lower())  # Process text with NLP
+    doc = get_nlp()(user_text.lower())  # Process text with NLP
     extracted_symptoms = [token.text for token in doc if
                           token.text in sum([d["symptoms"] for d in ILLNESS_DATABASE.values()], [])]
     return extracted_symptoms
@@ -68,7 +68,7 @@ def scrape_medicines(search_term):
     search_url = f"https://www.google.com/search?q={search_term.replace(' ', '+')}+medicine+site:healthline.com"
     headers = {"User-Agent": "Mozilla/5.0"}
 
-    response = requests.get(search_url, headers=headers)
+    response = http_get(search_url, headers=headers)
     soup = BeautifulSoup(response.text, "html.parser")
 
     medicine_results = []
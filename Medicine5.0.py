@@ -1,15 +1,15 @@
 import tkinter as tk
 from tkinter import messagebox
 import time
-import spacy
 import sqlite3
 import requests
 from bs4 import BeautifulSoup
 from threading import Thread
+from symptom_engine import get_nlp, warm_nlp_in_background
 from duckduckgo_search import DDGS
 
-# Load NLP model
-nlp = spacy.load("en_core_web_sm")
+# Load NLP model in the background so the window opens right away
+warm_nlp_in_background()
 
 # Initialize SQLite Database
 conn = sqlite3.connect("users.db")
@@ -41,7 +41,7 @@ ILLNESS_DATABASE = {
 
 # Function to extract symptoms from user input
 def extract_symptoms(user_text):
-    doc = nlp(user_text.lower())
+    doc = get_nlp()(user_text.lower())
     extracted_symptoms = [token.text for token in doc if token.text in sum([d["symptoms"] for d in ILLNESS_DATABASE.values()], [])]
     return extracted_symptoms
 
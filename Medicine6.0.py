@@ -1,14 +1,13 @@
 import tkinter as tk
 from tkinter import messagebox
 import time
-import spacy
 import sqlite3
-import requests
-from bs4 import BeautifulSoup
+from page_scrape import scrape_page
 from threading import Thread
+from symptom_engine import get_nlp, warm_nlp_in_background
 
-# Load NLP model
-nlp = spacy.load("en_core_web_sm")
+# Load NLP model in the background so the window opens right away
+warm_nlp_in_background()
 
 # Initialize SQLite Database
 conn = sqlite3.connect("users.db")
@@ -41,7 +40,7 @@ ILLNESS_DATABASE = {
 
 # Function to extract symptoms from user input
 def extract_symptoms(user_text):
-    doc = nlp(user_text.lower())
+    doc = get_nlp()(user_text.lower())
     extracted_symptoms = [token.text for token in doc if
                           token.text in sum([d["symptoms"] for d in ILLNESS_DATABASE.values()], [])]
     return extracted_symptoms
@@ -66,14 +65,9 @@ def diagnose(symptoms):
 # Function to scrape medicine names from WebMD
 def scrape_medicines(url):
     try:
-        response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        medicine_results = []
-        for item in soup.find_all(["h2", "h3"]):  # Look for section headings (common medicine names)
-            text = item.get_text().strip()
-            if "medicine" in text.lower() or "treatment" in text.lower() or "drug" in text.lower():
-                medicine_results.append(text)
+        # Look for section headings (common medicine names), reading only as much of the page as needed
+        matches = scrape_page(url, ["h2", "h3"], ["medicine", "treatment", "drug"])
+        medicine_results = [text for text, _ in matches]
 
         return medicine_results[:3] if medicine_results else ["No specific medicines found"]
 
@@ -1,15 +1,14 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
 import time
-import spacy
 import sqlite3
-import requests
+from page_scrape import scrape_page
 import webbrowser
-from bs4 import BeautifulSoup
 from threading import Thread
+from symptom_engine import get_nlp, warm_nlp_in_background
 
-# Load NLP model
-nlp = spacy.load("en_core_web_sm")
+# Load NLP model in the background so the window opens right away
+warm_nlp_in_background()
 
 # Initialize SQLite Database
 conn = sqlite3.connect("users.db")
@@ -54,7 +53,7 @@ ILLNESS_DATABASE = {
 
 # Function to extract symptoms from user input
 def extract_symptoms(user_text):
-    doc = nlp(user_text.lower())
+    doc = get_nlp()(user_text.lower())
     extracted_symptoms = [token.text for token in doc if
                           token.text in sum([d["symptoms"] for d in ILLNESS_DATABASE.values()], [])]
     return extracted_symptoms
@@ -79,21 +78,9 @@ def diagnose(symptoms):
 # Function to scrape medicine names from WebMD
 def scrape_medicines(url):
     try:
-        response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        medicine_results = []
-        medicine_links = []
-
-        for section in soup.find_all("a", href=True):
-            text = section.get_text().strip()
-            link = section["href"]
-
-            if any(keyword in text.lower() for keyword in ["medicine", "drug", "treatment", "medication"]):
-                medicine_results.append(text)
-                if "http" not in link:
-                    link = "https://www.webmd.com" + link
-                medicine_links.append(link)
+        matches = scrape_page(url, ["a"], ["medicine", "drug", "treatment", "medication"])
+        medicine_results = [text for text, _ in matches]
+        medicine_links = [link if "http" in link else "https://www.webmd.com" + link for _, link in matches]
 
         return medicine_results[:3], medicine_links[:3] if medicine_results else (["No specific medicines found"], [])
 
@@ -0,0 +1,97 @@
+import random
+import sys
+import time
+
+import symptom_engine
+
+PATIENT_COUNTS = [1, 10, 100, 1_000, 10_000, 100_000, 1_000_000]
+SYMPTOMS_PER_PATIENT = 4
+MICRO_ILLNESS_COUNTS = [3, 300, 30_000]
+MICRO_QUERIES = 200
+
+
+# Random knowledge base with the given number of illnesses
+def synthetic_database(illness_count, vocabulary_size, symptoms_per_illness=6, seed=0):
+    rng = random.Random(seed)
+    vocabulary = [f"symptom{i}" for i in range(vocabulary_size)]
+    return {f"illness{i}": {"symptoms": rng.sample(vocabulary, symptoms_per_illness)} for i in range(illness_count)}
+
+
+# Random patient x symptom matrix, built directly so a million patients fit in memory
+def synthetic_patients(kb, patient_count, seed=1):
+    import numpy as np
+    from scipy import sparse
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, len(kb.vocabulary), size=patient_count * SYMPTOMS_PER_PATIENT)
+    indptr = np.arange(0, len(indices) + 1, SYMPTOMS_PER_PATIENT)
+    data = np.ones(len(indices), dtype=np.int32)
+    matrix = sparse.csr_matrix((data, indices, indptr), shape=(patient_count, len(kb.vocabulary)))
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+
+# The per-illness set intersection loop from Medicine2.0.py - Medicine10.py
+def set_intersection_diagnose(database, symptoms):
+    matched_illness = None
+    best_match_count = 0
+    for illness, data in database.items():
+        common_symptoms = set(symptoms).intersection(data["symptoms"])
+        if len(common_symptoms) > best_match_count:
+            best_match_count = len(common_symptoms)
+            matched_illness = illness
+    return matched_illness
+
+
+# Single-query latency of each diagnose strategy against the original loop
+def micro():
+    print(f"{'illnesses':>10} {'set loop (us)':>14} {'bitset (us)':>12} {'index (us)':>11}")
+    for illness_count in MICRO_ILLNESS_COUNTS:
+        database = synthetic_database(illness_count, max(illness_count * 2, 12))
+        kb = symptom_engine.load_illness_database(database, fuzzy_distance=0)
+        rng = random.Random(2)
+        names = list(kb.vocabulary)
+        queries = [rng.sample(names, SYMPTOMS_PER_PATIENT) for _ in range(MICRO_QUERIES)]
+
+        timings = []
+        for run in (lambda q: set_intersection_diagnose(database, q), kb.best_match_bitset, kb.best_match):
+            start = time.perf_counter()
+            winners = [run(q) for q in queries]
+            timings.append((time.perf_counter() - start) / len(queries) * 1e6)
+            assert winners == [set_intersection_diagnose(database, q) for q in queries]
+        print(f"{illness_count:>10} {timings[0]:>14.1f} {timings[1]:>12.1f} {timings[2]:>11.1f}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--micro":
+        micro()
+        return
+
+    illness_count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    kb = symptom_engine.load_illness_database(synthetic_database(illness_count, illness_count * 2), fuzzy_distance=0)
+    names = list(kb.vocabulary)
+
+    print(f"{illness_count} illnesses, {len(kb.vocabulary)} symptoms")
+    print(f"{'patients':>10} {'diagnose_batch (s)':>19} {'patients/s':>12} {'diagnose loop (s)':>18}")
+    for count in PATIENT_COUNTS:
+        patients = synthetic_patients(kb, count)
+        start = time.perf_counter()
+        winners = symptom_engine.diagnose_batch(patients)
+        batch_seconds = time.perf_counter() - start
+
+        # The per-patient loop is only timed while it stays reasonably quick
+        loop_seconds = None
+        if count <= 10_000:
+            rows = [[names[i] for i in patients.indices[patients.indptr[r]:patients.indptr[r + 1]]]
+                    for r in range(count)]
+            start = time.perf_counter()
+            expected = [kb.best_match(symptoms) for symptoms in rows]
+            loop_seconds = time.perf_counter() - start
+            assert winners == expected, "diagnose_batch disagrees with diagnose"
+
+        loop_text = f"{loop_seconds:.4f}" if loop_seconds is not None else "-"
+        print(f"{count:>10} {batch_seconds:>19.4f} {count / batch_seconds:>12.0f} {loop_text:>18}")
+
+
+if __name__ == "__main__":
+    main()
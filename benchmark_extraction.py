@@ -0,0 +1,111 @@
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import symptom_engine
+
+# Same illnesses as Medicine10.py
+ILLNESS_DATABASE = {
+    "cold": {"symptoms": ["cough", "sneezing", "runny nose", "sore throat"]},
+    "flu": {"symptoms": ["fever", "chills", "body ache", "fatigue"]},
+    "migraine": {"symptoms": ["headache", "nausea", "light sensitivity"]},
+}
+
+SAMPLE_TEXTS = [
+    "I have a fever and chills since yesterday",
+    "Headache, nausea and some light sensitivity",
+    "Runny nose with a sore throat and cough",
+    "my whole body ache and I feel fatigue all day",
+]
+
+CALLS = 2000
+BATCH_TEXTS = 100_000
+BATCH_PROCESSES = [1, 2, 4]
+
+
+# Peak resident memory of this process in MB
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+# Measure one profile in the current process. Calls tokenize and match directly, so the
+# timings are real extractions and not hits in extract_symptoms' memo cache.
+def measure(profile):
+    baseline = peak_rss_mb()
+    symptom_engine.set_extraction_profile(profile)
+    kb = symptom_engine.load_illness_database(ILLNESS_DATABASE)
+
+    start = time.perf_counter()
+    kb.match(*symptom_engine.tokenize_text(SAMPLE_TEXTS[0]))
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(CALLS):
+        kb.match(*symptom_engine.tokenize_text(SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]))
+    per_call = (time.perf_counter() - start) / CALLS
+
+    return {
+        "profile": profile,
+        "load_ms": load_seconds * 1000,
+        "per_call_us": per_call * 1e6,
+        "rss_mb": peak_rss_mb(),
+        "rss_delta_mb": peak_rss_mb() - baseline,
+    }
+
+
+# Distinct complaints, so nothing is answered from a cache
+def batch_texts(count):
+    return [f"{SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]} for {i} days" for i in range(count)]
+
+
+# Texts per second of extract_symptoms_batch against a loop of single extractions (no memo cache)
+def batch():
+    print(f"{'profile':<10} {'loop (texts/s)':>15} " + " ".join(f"{f'batch n_process={n}':>20}" for n in BATCH_PROCESSES))
+    texts = batch_texts(BATCH_TEXTS)
+    for profile in symptom_engine.EXTRACTION_PROFILES:
+        symptom_engine.set_extraction_profile(profile)
+        kb = symptom_engine.load_illness_database(ILLNESS_DATABASE).warm()
+        try:
+            symptom_engine.tokenize_text("")
+        except OSError as e:
+            print(f"{profile:<10} {str(e).splitlines()[0][:60]}")
+            continue
+
+        start = time.perf_counter()
+        expected = [kb.match(*symptom_engine.tokenize_text(text)) for text in texts]
+        rates = [len(texts) / (time.perf_counter() - start)]
+        for n_process in BATCH_PROCESSES:
+            start = time.perf_counter()
+            found = list(symptom_engine.extract_symptoms_batch(texts, n_process=n_process))
+            rates.append(len(texts) / (time.perf_counter() - start))
+            assert found == expected, "extract_symptoms_batch disagrees with single extraction"
+        print(f"{profile:<10} {rates[0]:>15.0f} " + " ".join(f"{rate:>20.0f}" for rate in rates[1:]))
+
+
+# Each profile runs in a fresh interpreter so memory numbers do not leak between them
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--profile":
+        print(json.dumps(measure(sys.argv[2])))
+        return
+    if len(sys.argv) == 2 and sys.argv[1] == "--batch":
+        batch()
+        return
+
+    print(f"{'profile':<10} {'load (ms)':>10} {'per call (us)':>14} {'RSS (MB)':>9} {'RSS delta (MB)':>15}")
+    for profile in symptom_engine.EXTRACTION_PROFILES:
+        proc = subprocess.run([sys.executable, __file__, "--profile", profile], capture_output=True, text=True)
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+            print(f"{profile:<10} {error}")
+            continue
+        r = json.loads(proc.stdout)
+        print(f"{r['profile']:<10} {r['load_ms']:>10.1f} {r['per_call_us']:>14.1f} {r['rss_mb']:>9.1f} "
+              f"{r['rss_delta_mb']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import page_scrape
+from provider_http import http_get
+
+KEYWORDS = ["medicine", "drug", "treatment", "medication"]
+RUNS = 20
+
+
+# WebMD-sized article: a lot of markup, with the medicine links near the top like the real pages
+def synthetic_page(paragraphs=4000):
+    parts = ["<html><head><title>Flu treatment</title></head><body>"]
+    for i in range(paragraphs):
+        parts.append(f'<div class="article"><p>Paragraph {i} about the flu, '
+                     f'<a href="/related/{i}">related article {i}</a>.</p></div>')
+        if i in (20, 45, 90, 300):
+            parts.append(f'<a href="/drugs/{i}">Flu medication option {i}</a>')
+    parts.append("</body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def serve(page):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/flu"
+
+
+# The scrape_medicines loop from Medicine7.0.py / Medicine8.0.py
+def full_parse(url):
+    from bs4 import BeautifulSoup
+    response = http_get(url)
+    soup = BeautifulSoup(response.text, "html.parser")
+    results = []
+    for section in soup.find_all("a", href=True):
+        text = section.get_text().strip()
+        if any(keyword in text.lower() for keyword in KEYWORDS):
+            results.append((text, section["href"]))
+    return results[:3], len(response.content)
+
+
+def streaming_parse(url):
+    parser = page_scrape.MatchParser(["a"], KEYWORDS)
+    response = http_get(url, stream=True)
+    try:
+        read = page_scrape.feed_response(parser, response)
+    finally:
+        response.close()
+    return parser.matches, read
+
+
+# CPU ms per lookup, peak traced memory in MB and bytes read for one scraper
+def measure(scrape, url):
+    start = time.process_time()
+    for _ in range(RUNS):
+        results, read = scrape(url)
+    cpu_ms = (time.process_time() - start) / RUNS * 1000
+    tracemalloc.start()
+    scrape(url)
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return results, cpu_ms, peak, read
+
+
+def main():
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    server, url = serve(synthetic_page(paragraphs))
+    try:
+        print(f"{'parser':>10} {'CPU ms':>8} {'peak MB':>8} {'bytes read':>11}")
+        expected = None
+        for name, scrape in (("full", full_parse), ("streaming", streaming_parse)):
+            results, cpu_ms, peak, read = measure(scrape, url)
+            if expected is None:
+                expected = results
+            assert results == expected, f"{name} found {results}, expected {expected}"
+            print(f"{name:>10} {cpu_ms:>8.1f} {peak:>8.2f} {read:>11}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import csv
+import json
+import sys
+from collections import deque
+from multiprocessing import Pool
+
+import kb_store
+import symptom_engine
+
+# Records handed to a worker at a time, and how many of those batches may be in flight per worker.
+# Together they bound memory no matter how large the input is.
+CHUNK_SIZE = 256
+CHUNKS_IN_FLIGHT_PER_WORKER = 4
+
+
+# Input line that could not be read; it is written out as an error record instead of diagnosed
+class BadRecord(dict):
+    pass
+
+
+# Yield input records one at a time from a JSONL or CSV stream.
+# A JSONL line that is not valid JSON is reported on stderr and yielded as a BadRecord.
+def read_records(stream, input_format, text_field):
+    if input_format == "csv":
+        for row in csv.DictReader(stream):
+            yield row
+        return
+
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"Line {line_number}: invalid JSON ({e})", file=sys.stderr)
+            yield BadRecord(line=line_number, error=f"invalid JSON: {e}")
+            continue
+        # Plain JSON strings are complaints without any other fields
+        yield record if isinstance(record, dict) else {text_field: record}
+
+
+# Group a stream into lists of up to size items
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Set up the engine in this process (runs once per pool worker).
+# Every worker opens the same read-only, memory-mapped illness database.
+def init_engine(profile, kb_path):
+    symptom_engine.set_extraction_profile(profile)
+    symptom_engine.load_illness_database(kb_store.IllnessStore(kb_path))
+
+
+# Extract, diagnose and optionally look up medicines for one record
+def process_record(record, text_field, top_k, with_medicines):
+    if isinstance(record, BadRecord):
+        return dict(record)
+    # JSON records may carry a number (or anything else) in the text field; match its string form
+    text = record.get(text_field)
+    text = "" if text is None else str(text)
+    symptoms = symptom_engine.extract_symptoms(text)
+    ranked = symptom_engine.diagnose_topk(symptoms, top_k)
+
+    result = dict(record)
+    result["symptoms"] = symptoms
+    result["diagnosis"] = ranked[0][0] if ranked else None
+    result["candidates"] = [[illness, round(score, 4)] for illness, score in ranked]
+    if with_medicines and ranked:
+        from medicine_providers import find_medicines
+        data = symptom_engine.get_knowledge_base().database[ranked[0][0]]
+        medicines, links, stale = find_medicines(ranked[0][0], data.get("search_query"),
+                                                 search_url=data.get("search_url"))
+        result["medicines"] = [{"name": name, "link": link} for name, link in zip(medicines, links)]
+        result["medicines_stale"] = stale
+    return result
+
+
+def process_chunk(records, text_field, top_k, with_medicines):
+    return [process_record(record, text_field, top_k, with_medicines) for record in records]
+
+
+# Diagnose every record and yield results in input order, keeping only a bounded number of chunks in flight
+def diagnose_stream(records, text_field="complaint", top_k=3, with_medicines=False, workers=1,
+                    profile="tokenizer", kb_path=kb_store.KB_PATH, chunk_size=CHUNK_SIZE):
+    chunks = chunked(records, chunk_size)
+    args = (text_field, top_k, with_medicines)
+
+    if workers <= 1:
+        init_engine(profile, kb_path)
+        for chunk in chunks:
+            yield from process_chunk(chunk, *args)
+        return
+
+    with Pool(workers, initializer=init_engine, initargs=(profile, kb_path)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(process_chunk, (chunk,) + args))
+            if len(pending) >= workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diagnose complaints from a JSONL/CSV file or stdin without the GUI.")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL or CSV file, or - for stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file, or - for stdout (default)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="input format (default: from file extension, else jsonl)")
+    parser.add_argument("--text-field", default="complaint", help="field holding the complaint text")
+    parser.add_argument("--top-k", type=int, default=3, help="candidate illnesses per record")
+    parser.add_argument("--medicines", action="store_true", help="also look up medicines for the diagnosis")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default: 1, in-process)")
+    parser.add_argument("--kb", help=f"compiled illness database, opened read-only (default: {kb_store.KB_PATH}, "
+                                     f"recompiled from {kb_store.KB_SOURCE} when that is newer)")
+    parser.add_argument("--profile", default="tokenizer", choices=symptom_engine.EXTRACTION_PROFILES,
+                        help="extraction profile")
+    args = parser.parse_args(argv)
+
+    # Compile illnesses.json up front (default database only) so the workers only ever read it
+    kb_store.open_given_database(args.kb).close()
+    kb_path = args.kb or kb_store.KB_PATH
+
+    input_format = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    source = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        records = read_records(source, input_format, args.text_field)
+        for result in diagnose_stream(records, args.text_field, args.top_k, args.medicines, args.workers,
+                                      args.profile, kb_path):
+            target.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+
+if __name__ == "__main__":
+    main()
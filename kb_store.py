@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections.abc import Mapping
+
+import symptom_engine
+from symptom_engine import tokenize_phrase
+
+# Editable illness data, and the compiled database the apps read
+KB_SOURCE = "illnesses.json"
+KB_PATH = "illnesses.db"
+
+# How often the watcher checks illnesses.json / illnesses.db for changes, in seconds
+WATCH_INTERVAL = 2.0
+
+# Let SQLite memory-map up to this many bytes of the database file; the OS page cache
+# then shares those pages between every process that opens it
+MMAP_SIZE = 256 * 1024 * 1024
+
+SCHEMA = '''
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE illnesses (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE symptoms (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+);
+CREATE TABLE illness_symptoms (
+    illness_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    symptom_id INTEGER NOT NULL,
+    PRIMARY KEY (illness_id, position)
+) WITHOUT ROWID;
+CREATE INDEX illness_symptoms_by_symptom ON illness_symptoms (symptom_id, illness_id);
+'''
+
+
+# Checksum of the illness data, stored in the database so changes can be detected cheaply
+def database_checksum(database):
+    encoded = json.dumps(database, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+# Write an ILLNESS_DATABASE-style dict to a SQLite file, replacing it atomically.
+# Symptoms are stored normalized (lowercase, single spaces) and once per illness.
+def save_illness_database(database, path=KB_PATH):
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        symptom_ids = {}
+        illness_rows = []
+        link_rows = []
+        for illness_id, (illness, data) in enumerate(database.items()):
+            if not isinstance(data, dict):
+                data = {"symptoms": data}
+            extra = {key: value for key, value in data.items() if key != "symptoms"}
+            illness_rows.append((illness_id, illness, json.dumps(extra)))
+            seen = set()
+            for symptom in data["symptoms"]:
+                symptom_id = symptom_ids.setdefault(" ".join(tokenize_phrase(symptom)), len(symptom_ids))
+                if symptom_id not in seen:
+                    seen.add(symptom_id)
+                    link_rows.append((illness_id, len(seen) - 1, symptom_id))
+
+        conn.executemany("INSERT INTO illnesses (id, name, data) VALUES (?, ?, ?)", illness_rows)
+        conn.executemany("INSERT INTO symptoms (id, name) VALUES (?, ?)",
+                         ((symptom_id, symptom) for symptom, symptom_id in symptom_ids.items()))
+        conn.executemany("INSERT INTO illness_symptoms (illness_id, position, symptom_id) VALUES (?, ?, ?)",
+                         link_rows)
+        conn.execute("INSERT INTO meta (key, value) VALUES ('checksum', ?)", (database_checksum(database),))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+
+
+# Read-only, lazily loaded view of a compiled illness database.
+# It behaves like the ILLNESS_DATABASE dict: store["flu"]["search_query"], len(store), store.items().
+class IllnessStore(Mapping):
+    def __init__(self, path=KB_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self.conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        self.lock = threading.Lock()
+        self._names = None
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    @property
+    def checksum(self):
+        row = self._query("SELECT value FROM meta WHERE key = 'checksum'")
+        return row[0][0] if row else None
+
+    def names(self):
+        if self._names is None:
+            self._names = [name for (name,) in self._query("SELECT name FROM illnesses ORDER BY id")]
+        return self._names
+
+    def __len__(self):
+        return len(self.names())
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def __contains__(self, illness):
+        return bool(self._query("SELECT 1 FROM illnesses WHERE name = ?", (illness,)))
+
+    def __getitem__(self, illness):
+        row = self._query("SELECT id, data FROM illnesses WHERE name = ?", (illness,))
+        if not row:
+            raise KeyError(illness)
+        illness_id, data = row[0]
+        symptoms = self._query('''
+            SELECT s.name FROM illness_symptoms l JOIN symptoms s ON s.id = l.symptom_id
+            WHERE l.illness_id = ? ORDER BY l.position
+        ''', (illness_id,))
+        return {"symptoms": [name for (name,) in symptoms], **json.loads(data)}
+
+    # Every illness in database order, read with two sequential scans instead of one query per illness
+    def items(self):
+        symptom_names = [name for (name,) in self._query("SELECT name FROM symptoms ORDER BY id")]
+        links = self._query("SELECT illness_id, symptom_id FROM illness_symptoms ORDER BY illness_id, position")
+        by_illness = {}
+        for illness_id, symptom_id in links:
+            by_illness.setdefault(illness_id, []).append(symptom_names[symptom_id])
+        for illness_id, name, data in self._query("SELECT id, name, data FROM illnesses ORDER BY id"):
+            yield name, {"symptoms": by_illness.get(illness_id, []), **json.loads(data)}
+
+    # IDs and inverted index for symptom_engine.KnowledgeBase, straight from the tables:
+    # (illness names, symptom names, symptom IDs per illness, illness IDs per symptom)
+    def compiled(self):
+        illness_names = self.names()
+        symptom_names = [name for (name,) in self._query("SELECT name FROM symptoms ORDER BY id")]
+        illness_symptoms = [[] for _ in illness_names]
+        for illness_id, symptom_id in self._query(
+                "SELECT illness_id, symptom_id FROM illness_symptoms ORDER BY illness_id, position"):
+            illness_symptoms[illness_id].append(symptom_id)
+        postings = [[] for _ in symptom_names]
+        for symptom_id, illness_id in self._query(
+                "SELECT symptom_id, illness_id FROM illness_symptoms ORDER BY symptom_id, illness_id"):
+            postings[symptom_id].append(illness_id)
+        return illness_names, symptom_names, illness_symptoms, postings
+
+    def close(self):
+        self.conn.close()
+
+
+# Recompile the database if the JSON source is newer, then open it
+def open_illness_database(path=KB_PATH, source=KB_SOURCE):
+    if os.path.exists(source) and (not os.path.exists(path) or os.path.getmtime(source) > os.path.getmtime(path)):
+        with open(source, encoding="utf-8") as f:
+            save_illness_database(json.load(f), path)
+    return IllnessStore(path)
+
+
+# Open the database a command was pointed at. Without a path that is illnesses.db, recompiled
+# from illnesses.json when needed; a path given explicitly is only ever read, never overwritten.
+def open_given_database(path=None):
+    if path is None:
+        return open_illness_database()
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No compiled illness database at {path}")
+    return IllnessStore(path)
+
+
+# Size and modification time of a file, or None if it does not exist
+def _file_state(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+# Background thread that reloads the knowledge base when illnesses.json or illnesses.db changes.
+# The new snapshot (phrase trie, typo index, inverted index, scorer tables) is fully built on this
+# thread and only then swapped in, so no request ever sees a half-built index.
+class KnowledgeBaseWatcher(threading.Thread):
+    def __init__(self, path=KB_PATH, source=KB_SOURCE, interval=WATCH_INTERVAL, on_reload=None):
+        super().__init__(name="kb-watcher", daemon=True)
+        self.path = path
+        self.source = source
+        self.interval = interval
+        self.on_reload = on_reload
+        self.stopped = threading.Event()
+        self.seen = (_file_state(source), _file_state(path))
+        self.checksum = self._active_checksum()
+
+    @staticmethod
+    def _active_checksum():
+        try:
+            return getattr(symptom_engine.get_knowledge_base().database, "checksum", None)
+        except RuntimeError:
+            return None
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            state = (_file_state(self.source), _file_state(self.path))
+            if state != self.seen:
+                self.seen = state
+                self.reload()
+
+    # Rebuild and swap in the knowledge base if the data really changed
+    def reload(self):
+        try:
+            store = open_illness_database(self.path, self.source)
+            if store.checksum == self.checksum:
+                store.close()
+                return False
+            kb = symptom_engine.build_knowledge_base(store).warm(full=True)
+        except Exception as e:
+            # Keep serving the previous snapshot; a half-saved file is retried on its next change
+            print(f"Error reloading illness database: {e}")
+            return False
+
+        if not symptom_engine.install_knowledge_base(kb):
+            return False
+        self.checksum = store.checksum
+        # The database file was replaced, so this state is the new baseline
+        self.seen = (_file_state(self.source), _file_state(self.path))
+        if self.on_reload is not None:
+            self.on_reload(kb)
+        return True
+
+    def stop(self):
+        self.stopped.set()
+
+
+# Start watching the illness database in the background
+def watch_illness_database(path=KB_PATH, source=KB_SOURCE, interval=WATCH_INTERVAL, on_reload=None):
+    watcher = KnowledgeBaseWatcher(path, source, interval, on_reload)
+    watcher.start()
+    return watcher
+
+
+# python kb_store.py [illnesses.json] [illnesses.db]
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else KB_SOURCE
+    path = sys.argv[2] if len(sys.argv) > 2 else KB_PATH
+    with open(source, encoding="utf-8") as f:
+        database = json.load(f)
+    save_illness_database(database, path)
+    print(f"Compiled {len(database)} illnesses from {source} into {path}")
@@ -0,0 +1,176 @@
+import json
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = "medicine_cache.db"
+
+# Good results are served fresh for FRESH_TTL, then served stale (and refreshed in the background)
+# until STALE_TTL. Failed and empty lookups are remembered for NEGATIVE_TTL so a broken
+# provider is not hammered. All in seconds.
+FRESH_TTL = 7 * 24 * 3600
+STALE_TTL = 30 * 24 * 3600
+NEGATIVE_TTL = 5 * 60
+
+
+# Runs at most one call per key at a time: callers arriving while a call for their key is in
+# flight wait for it and share its result (or its exception) instead of starting their own
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.in_flight.get(key)
+            if call is None:
+                call = self.in_flight[key] = {"done": threading.Event(), "result": None, "error": None}
+                self.executed += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            call["done"].set()
+        return call["result"]
+
+    # {"calls", "executed", "coalesced"}: coalesced calls are upstream requests saved
+    def stats(self):
+        with self.lock:
+            return {"calls": self.executed + self.coalesced, "executed": self.executed, "coalesced": self.coalesced}
+
+
+# Persistent key -> JSON value cache in SQLite, with an in-memory copy of every row read,
+# so repeated lookups never touch the disk. A value of None is a cached failure; None and
+# empty values are only kept for the negative TTL.
+class ResultCache:
+    def __init__(self, path=CACHE_PATH, fresh_ttl=FRESH_TTL, stale_ttl=STALE_TTL, negative_ttl=NEGATIVE_TTL):
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS results (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            fetched_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        ''')
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.memory = {}
+        self.refreshing = set()
+        self.flight = SingleFlight()
+
+    # (value, fetched_at, expires_at) for a key, or None
+    def _entry(self, key):
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is None:
+                row = self.conn.execute("SELECT value, fetched_at, expires_at FROM results WHERE key = ?",
+                                        (key,)).fetchone()
+                if row is None:
+                    return None
+                value = json.loads(row[0]) if row[0] is not None else None
+                entry = (value, row[1], row[2])
+                self.memory[key] = entry
+            return entry
+
+    def put(self, key, value, ttl=None, fetched_at=None):
+        now = time.time()
+        if ttl is None:
+            ttl = self.fresh_ttl if value else self.negative_ttl
+        entry = (value, fetched_at or now, now + ttl)
+        with self.lock:
+            self.memory[key] = entry
+            self.conn.execute("INSERT OR REPLACE INTO results (key, value, fetched_at, expires_at) VALUES (?, ?, ?, ?)",
+                              (key, json.dumps(value) if value is not None else None, entry[1], entry[2]))
+            self.conn.commit()
+
+    def is_fresh(self, key):
+        entry = self._entry(key)
+        return entry is not None and time.time() < entry[2]
+
+    # True if the value cached for key was fetched longer than the fresh TTL ago, i.e. it is
+    # being served stale (while revalidating, or because its source is failing)
+    def is_stale(self, key):
+        entry = self._entry(key)
+        return entry is not None and entry[0] is not None and time.time() >= entry[1] + self.fresh_ttl
+
+    # Cached value for key, calling fetch() only when needed. fetch raises on failure.
+    #   fresh entry              -> returned as is
+    #   expired but recent value -> returned at once, fetch() runs on a background thread
+    #   otherwise                -> fetch() runs now; on failure the last good value is kept
+    #                               if there is one, else the failure is cached as None
+    # A failure is not retried for the negative TTL, or for e.retry_after seconds if the exception has it.
+    def get_or_fetch(self, key, fetch):
+        entry = self._entry(key)
+        now = time.time()
+        if entry is not None:
+            value, fetched_at, expires_at = entry
+            if now < expires_at:
+                return value
+            if value and now < fetched_at + self.stale_ttl:
+                self._refresh_in_background(key, fetch)
+                return value
+        return self.refresh(key, fetch, force=False)
+
+    # Call fetch() now and store its result; on failure keep the last good value if there is one.
+    # Concurrent refreshes of the same key share a single fetch() call. With force=False the
+    # entry is checked again once inside the flight, so a caller that missed the cache just
+    # before another caller's fetch finished takes that result instead of fetching again.
+    def refresh(self, key, fetch, force=True):
+        return self.flight.do(key, lambda: self._refresh(key, fetch, force))
+
+    def _refresh(self, key, fetch, force=True):
+        entry = self._entry(key)
+        if not force and entry is not None and time.time() < entry[2]:
+            return entry[0]
+        try:
+            value = fetch()
+        except Exception as e:
+            print(f"Error fetching {key}: {e}")
+            ttl = getattr(e, "retry_after", None) or self.negative_ttl
+            if entry is not None and entry[0]:
+                # Keep the good value (and when it was fetched), but do not retry before ttl runs out
+                self.put(key, entry[0], ttl, fetched_at=entry[1])
+                return entry[0]
+            self.put(key, None, ttl)
+            return None
+        self.put(key, value)
+        return value
+
+    def _refresh_in_background(self, key, fetch):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def refresh():
+            try:
+                self.refresh(key, fetch, force=False)
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"refresh {key}", daemon=True).start()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,328 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from medicine_cache import ResultCache
+
+RXNORM_API_URL = "https://rxnav.nlm.nih.gov/REST/drugs.json?name="
+WEBMD_SEARCH_URL = "https://www.webmd.com/search/search_results/default.aspx?query="
+
+# How long the aggregator waits for each provider, in seconds, and how many distinct
+# medicines are enough to answer without waiting for the slower providers
+PROVIDER_DEADLINES = {"duckduckgo": 4.0, "rxnorm": 3.0, "webmd": 5.0, "webmd_page": 5.0}
+ENOUGH_MEDICINES = 3
+
+# Lookups run at once by the cache warm-up, and how often `python medicine_providers.py --every` repeats it
+WARM_WORKERS = 4
+WARM_INTERVAL = 6 * 3600
+
+# Circuit breaker settings, per provider. Over the last BREAKER_WINDOW calls (once there are at least
+# BREAKER_MIN_CALLS), an error rate of BREAKER_ERROR_RATE or more opens the circuit; a call slower
+# than BREAKER_SLOW_CALL seconds counts as an error even if it succeeded. An open circuit fails
+# fast for BREAKER_OPEN_SECONDS, then lets one probe call through (half-open) to decide whether
+# to close again.
+BREAKER_WINDOW = 20
+BREAKER_MIN_CALLS = 5
+BREAKER_ERROR_RATE = 0.5
+BREAKER_SLOW_CALL = 3.0
+BREAKER_OPEN_SECONDS = 30.0
+
+# Provider calls block on HTTP, so they run on these threads. The pool outlives each
+# gather_medicines call, so a lookup never waits on a cancelled provider's thread.
+_provider_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="medicine-provider")
+
+# Results of web medicine searches, kept across runs in medicine_cache.db
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_medicine_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+# Each fetch_* function returns medicines as [name, link] pairs and raises if the source fails.
+# Its HTTP requests, retries included, give up within the provider's deadline, so a call
+# abandoned by gather_medicines does not hold a _provider_pool thread for much longer.
+
+# Ask DuckDuckGo for medicines
+def fetch_duckduckgo(query):
+    from duckduckgo_search import DDGS
+    with DDGS(timeout=PROVIDER_DEADLINES["duckduckgo"]) as ddgs:
+        results = list(ddgs.text(query, max_results=3))
+    return [[res["title"], res["href"]] for res in results]
+
+
+# Look up drugs by name in RxNorm, from the local mirror when one has been imported
+def fetch_rxnorm(name):
+    import rxnorm_mirror
+    if rxnorm_mirror.mirror_available():
+        names = rxnorm_mirror.find_drugs(name, 5)
+    else:
+        from provider_http import http_get
+        response = http_get(RXNORM_API_URL + quote(name), deadline=PROVIDER_DEADLINES["rxnorm"])
+        response.raise_for_status()
+        names = [med["name"] for group in response.json().get("drugGroup", {}).get("conceptGroup", [])
+                 for med in group.get("conceptProperties", [])][:5]
+    return [[med, f"https://mor.nlm.nih.gov/RxNav/search?searchBy=0&searchTerm={quote(med)}"] for med in names]
+
+
+# Scrape drug and medication titles from WebMD's search results
+def fetch_webmd(disease):
+    from page_scrape import scrape_page
+    matches = scrape_page(WEBMD_SEARCH_URL + quote(f"{disease} medicine"), ["div"], ["drug", "medication"],
+                          class_="search-results-doc-title", deadline=PROVIDER_DEADLINES["webmd"])
+    return [[title, link if link.startswith("http") else "https://www.webmd.com" + link]
+            for title, link in matches if link]
+
+
+# Scrape medicine, drug and treatment links from a WebMD article
+def fetch_webmd_page(url):
+    from page_scrape import scrape_page
+    matches = scrape_page(url, ["a"], ["medicine", "drug", "treatment", "medication"],
+                          deadline=PROVIDER_DEADLINES["webmd_page"])
+    return [[text, link if "http" in link else "https://www.webmd.com" + link] for text, link in matches]
+
+
+PROVIDERS = {"duckduckgo": fetch_duckduckgo, "rxnorm": fetch_rxnorm, "webmd": fetch_webmd,
+             "webmd_page": fetch_webmd_page}
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} circuit is open, retry in {retry_after:.0f}s")
+        # Read by ResultCache: do not cache this failure for longer than the circuit stays open
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS, error_rate=BREAKER_ERROR_RATE,
+                 slow_call=BREAKER_SLOW_CALL, open_seconds=BREAKER_OPEN_SECONDS):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.open_seconds = open_seconds
+        self.lock = threading.Lock()
+        self.outcomes = deque(maxlen=window)    # True for a failed or slow call
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probing = False
+        self.rejected = 0
+        self.trips = 0
+
+    # Reserve the right to make a call, or raise CircuitOpenError
+    def _before_call(self):
+        with self.lock:
+            if self.state == "open":
+                remaining = self.opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self.probing:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, 1.0)
+                self.probing = True
+
+    def _after_call(self, failed):
+        with self.lock:
+            if self.state == "half_open":
+                self.probing = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = "closed"
+                    self.outcomes.clear()
+                return
+            self.outcomes.append(failed)
+            if (self.state == "closed" and len(self.outcomes) >= self.min_calls
+                    and sum(self.outcomes) >= self.error_rate * len(self.outcomes)):
+                self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        self.outcomes.clear()
+
+    # Run fn(*args) through the breaker
+    def call(self, fn, *args):
+        self._before_call()
+        start = time.monotonic()
+        try:
+            result = fn(*args)
+        except BaseException:
+            self._after_call(True)
+            raise
+        self._after_call(time.monotonic() - start > self.slow_call)
+        return result
+
+    def stats(self):
+        with self.lock:
+            return {"state": self.state, "recent_calls": len(self.outcomes), "recent_errors": sum(self.outcomes),
+                    "trips": self.trips, "rejected": self.rejected}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider):
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
+
+
+# {provider: {"state", "recent_calls", "recent_errors", "trips", "rejected"}}
+def breaker_stats():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
+
+
+# Search term for each provider that can answer for an illness
+def provider_terms(illness, search_query=None, search_url=None):
+    terms = {"duckduckgo": search_query or f"best medicine for {illness}", "rxnorm": illness, "webmd": illness}
+    if search_url:
+        terms["webmd_page"] = search_url
+    return terms
+
+
+# Fetch function for the cache: calls the provider through its circuit breaker
+def _fetcher(provider, term):
+    return lambda: get_breaker(provider).call(PROVIDERS[provider], term)
+
+
+# One provider's [name, link] pairs for a search term, from the cache when possible, as
+# (results, stale). results is None if the provider failed and nothing was cached before;
+# stale is true when an old result is served because the provider is failing or refreshing.
+def lookup(provider, term):
+    cache = get_medicine_cache()
+    key = f"{provider}:{term}"
+    results = cache.get_or_fetch(key, _fetcher(provider, term))
+    return results, cache.is_stale(key)
+
+
+# How many provider lookups shared another caller's in-flight request instead of making their own
+def coalescing_stats():
+    return get_medicine_cache().flight.stats()
+
+
+# Use DuckDuckGo to fetch medicine names, answering from the cache when possible
+def search_medicines(query):
+    results, _ = lookup("duckduckgo", query)
+    if results is None:
+        return ["Error fetching medicines"], []
+    if not results:
+        return ["No specific medicines found"], []
+    return [title for title, _ in results], [link for _, link in results]
+
+
+# Add results to merged, skipping medicines already there (compared by lowercased name)
+def _merge(merged, seen, results):
+    for name, link in results:
+        key = " ".join(name.lower().split())
+        if key not in seen:
+            seen.add(key)
+            merged.append([name, link])
+
+
+# Query every provider at once, each under its own deadline, and return merged [name, link] pairs
+# as soon as `enough` distinct medicines have arrived. Providers still running are cancelled
+# (a request already on the wire finishes in its worker thread, but nobody waits for it).
+# Results are merged in provider order (the order of `providers`, else PROVIDERS), not arrival
+# order, when several arrive together.
+# Returns (merged, stale); stale is true if any merged result is an old one served from the cache.
+async def gather_medicines(illness, search_query=None, enough=ENOUGH_MEDICINES, providers=None, search_url=None):
+    terms = provider_terms(illness, search_query, search_url)
+
+    async def run(provider):
+        call = asyncio.get_running_loop().run_in_executor(_provider_pool, lookup, provider, terms[provider])
+        return await asyncio.wait_for(call, PROVIDER_DEADLINES.get(provider, 5.0))
+
+    names = [provider for provider in providers or terms if provider in terms]
+    tasks = {asyncio.ensure_future(run(provider)): provider for provider in names}
+    pending = set(tasks)
+    merged, seen = [], set()
+    stale = False
+    try:
+        while pending and len(merged) < enough:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda task: names.index(tasks[task])):
+                if task.exception() is None and task.result()[0]:
+                    results, result_stale = task.result()
+                    _merge(merged, seen, results)
+                    stale = stale or result_stale
+    finally:
+        for task in pending:
+            task.cancel()
+    return merged, stale
+
+
+# Blocking wrapper around gather_medicines, returning (medicines, links, stale)
+def find_medicines(illness, search_query=None, enough=ENOUGH_MEDICINES, providers=None, search_url=None):
+    merged, stale = asyncio.run(gather_medicines(illness, search_query, enough, providers, search_url))
+    if not merged:
+        return ["No specific medicines found"], [], False
+    return [name for name, _ in merged[:enough]], [link for _, link in merged[:enough]], stale
+
+
+# Fetch and cache every provider's answer for every illness, WARM_WORKERS lookups at a time,
+# so interactive diagnoses are answered from the cache. Entries that are still fresh are
+# skipped unless force is set. Returns (lookups fetched, lookups that failed).
+def warm_medicine_cache(database=None, workers=WARM_WORKERS, force=False):
+    if database is None:
+        import symptom_engine
+        database = symptom_engine.get_knowledge_base().database
+    cache = get_medicine_cache()
+    jobs = set()
+    for illness, data in database.items():
+        for provider, term in provider_terms(illness, data.get("search_query"), data.get("search_url")).items():
+            if force or not cache.is_fresh(f"{provider}:{term}"):
+                jobs.add((provider, term))
+
+    def warm(job):
+        provider, term = job
+        return cache.refresh(f"{provider}:{term}", _fetcher(provider, term)) is not None
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="medicine-warm") as pool:
+        failed = list(pool.map(warm, sorted(jobs))).count(False)
+    return len(jobs), failed
+
+
+# python medicine_providers.py [--every SECONDS] [--workers N] [--force]
+# Warm the medicine cache once, or every SECONDS until interrupted (e.g. from a scheduler or a service)
+def main(argv=None):
+    import argparse
+    import kb_store
+    parser = argparse.ArgumentParser(description="Pre-fill the medicine cache for every illness in the knowledge base.")
+    parser.add_argument("--kb", help=f"compiled illness database, opened read-only (default: {kb_store.KB_PATH}, "
+                                     f"recompiled from {kb_store.KB_SOURCE} when that is newer)")
+    parser.add_argument("--workers", type=int, default=WARM_WORKERS, help="lookups run at once")
+    parser.add_argument("--force", action="store_true", help="refetch entries that are still fresh")
+    parser.add_argument("--every", type=float, nargs="?", const=WARM_INTERVAL,
+                        help=f"repeat every this many seconds (default: {WARM_INTERVAL})")
+    args = parser.parse_args(argv)
+
+    while True:
+        store = kb_store.open_given_database(args.kb)
+        start = time.perf_counter()
+        fetched, failed = warm_medicine_cache(store, args.workers, args.force)
+        store.close()
+        print(f"Warmed {fetched} medicine lookups ({failed} failed) in {time.perf_counter() - start:.1f}s")
+        if args.every is None:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
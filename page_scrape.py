@@ -0,0 +1,180 @@
+import codecs
+import json
+import sqlite3
+import threading
+import time
+from html.parser import HTMLParser
+
+from provider_http import http_get
+
+# Bytes read from the socket per step; parsing stops between steps once enough matches are found
+CHUNK_SIZE = 16 * 1024
+
+# Pages scraped before, with their validators, so unchanged pages are answered by a 304
+PAGE_STORE_PATH = "page_store.db"
+
+
+# Incremental parser that keeps only the elements the scrapers look at: tags named in `tags`
+# (optionally with a given class) whose text contains one of `keywords`. Each match is
+# (text, href), href being the element's own link for <a> tags, or the first link inside it.
+# Nothing else is stored, and `done` turns true as soon as `limit` matches are collected; after
+# that the rest of the chunk being fed is ignored, so there are never more than `limit` matches.
+class MatchParser(HTMLParser):
+    def __init__(self, tags, keywords, limit=3, class_=None):
+        super().__init__(convert_charrefs=True)
+        self.tags = set(tags)
+        self.keywords = keywords
+        self.limit = limit
+        self.class_ = class_
+        self.matches = []
+        self.done = False
+        self.current = None     # tag being collected
+        self.depth = 0          # nesting of that tag, for elements nested in themselves
+        self.text = []
+        self.href = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if self.current is not None:
+            if tag == self.current:
+                self.depth += 1
+            elif tag == "a" and self.href is None:
+                self.href = dict(attrs).get("href")
+            return
+        if tag not in self.tags:
+            return
+        attrs = dict(attrs)
+        if self.class_ is not None and self.class_ not in (attrs.get("class") or "").split():
+            return
+        if tag == "a" and attrs.get("href") is None:
+            return
+        self.current, self.depth, self.text = tag, 1, []
+        self.href = attrs.get("href") if tag == "a" else None
+
+    def handle_endtag(self, tag):
+        if self.done or tag != self.current:
+            return
+        self.depth -= 1
+        if self.depth:
+            return
+        self.current = None
+        text = "".join(self.text).strip()
+        if any(keyword in text.lower() for keyword in self.keywords):
+            self.matches.append((text, self.href))
+            self.done = len(self.matches) >= self.limit
+
+    def handle_data(self, data):
+        if not self.done and self.current is not None:
+            self.text.append(data)
+
+
+# Feed a streamed response into parser until it is done or the body ends; returns the number of bytes read
+def feed_response(parser, response, chunk_size=CHUNK_SIZE):
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+    read = 0
+    for chunk in response.iter_content(chunk_size):
+        read += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        if parser.done:
+            return read
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return read
+
+
+# Scraped pages, one row per (url, what was scraped from it): the matches found in it and the
+# ETag / Last-Modified validators it came with. The page itself is not kept; a 304 is answered
+# from the matches.
+class PageStore:
+    def __init__(self, path=PAGE_STORE_PATH):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT NOT NULL,
+            spec TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            matches TEXT NOT NULL,
+            checked_at REAL NOT NULL,
+            PRIMARY KEY (url, spec)
+        )
+        ''')
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+    # (etag, last_modified, matches) for a page, or None
+    def get(self, url, spec):
+        with self.lock:
+            row = self.conn.execute("SELECT etag, last_modified, matches FROM pages WHERE url = ? AND spec = ?",
+                                    (url, spec)).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, matches = row
+        return etag, last_modified, [tuple(match) for match in json.loads(matches)]
+
+    def put(self, url, spec, etag, last_modified, matches):
+        with self.lock:
+            self.conn.execute('''
+                INSERT OR REPLACE INTO pages (url, spec, etag, last_modified, matches, checked_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (url, spec, etag, last_modified, json.dumps(matches), time.time()))
+            self.conn.commit()
+
+    # Record a 304: the stored page is still current, possibly under new validators
+    def revalidated(self, url, spec, etag, last_modified):
+        with self.lock:
+            self.conn.execute('''
+                UPDATE pages SET etag = coalesce(?, etag), last_modified = coalesce(?, last_modified), checked_at = ?
+                WHERE url = ? AND spec = ?
+            ''', (etag, last_modified, time.time(), url, spec))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+_page_store = None
+_page_store_lock = threading.Lock()
+
+
+def get_page_store():
+    global _page_store
+    with _page_store_lock:
+        if _page_store is None:
+            _page_store = PageStore()
+        return _page_store
+
+
+# Download url and return up to limit (text, href) matches (see MatchParser), reading no more
+# of the page than needed to find them. A page scraped before is revalidated with
+# If-None-Match / If-Modified-Since, and on a 304 the stored matches are returned unparsed.
+# deadline bounds the request and its retries, in seconds (see provider_http.http_get).
+def scrape_page(url, tags, keywords, limit=3, class_=None, store=None, deadline=None):
+    store = store or get_page_store()
+    spec = json.dumps([sorted(tags), list(keywords), limit, class_])
+    stored = store.get(url, spec)
+    headers = {}
+    if stored is not None:
+        etag, last_modified = stored[0], stored[1]
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    response = http_get(url, headers=headers or None, stream=True, deadline=deadline)
+    try:
+        if response.status_code == 304 and stored is not None:
+            store.revalidated(url, spec, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            return stored[2]
+        response.raise_for_status()
+        parser = MatchParser(tags, keywords, limit, class_)
+        feed_response(parser, response)
+    finally:
+        # Closing before the end drops the connection instead of draining the rest of the page
+        response.close()
+
+    etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+    if etag or last_modified:
+        store.put(url, spec, etag, last_modified, parser.matches)
+    return parser.matches
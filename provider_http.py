@@ -0,0 +1,149 @@
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+# Every medicine provider goes through one pooled session, so repeat lookups reuse
+# kept-alive connections instead of paying a new TCP + TLS handshake each time.
+USER_AGENT = "Mozilla/5.0"
+HOST_CONNECTIONS = 4       # open connections per host; further requests wait for a free one
+CONNECT_TIMEOUT = 3.05     # seconds to establish a connection
+READ_TIMEOUT = 10          # seconds to wait for the server between bytes
+RETRIES = 3                # extra attempts after the first one
+BACKOFF_BASE = 0.5         # seconds; attempt n waits a random time up to BACKOFF_BASE * 2 ** n
+BACKOFF_MAX = 8
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+LATENCY_SAMPLES = 200      # recent request latencies kept per host for percentiles
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=HOST_CONNECTIONS, pool_block=True)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+# Success, retry and latency counters for one host
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def percentile(self, fraction):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        return {
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "retries": self.retries,
+            "success_rate": self.successes / self.requests if self.requests else None,
+            "p50_ms": _ms(self.percentile(0.5)),
+            "p95_ms": _ms(self.percentile(0.95)),
+        }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _record(host, seconds, ok, retried):
+    with _stats_lock:
+        stats = _stats.setdefault(host, HostStats())
+        stats.requests += 1
+        stats.retries += retried
+        if ok:
+            stats.successes += 1
+            stats.latencies.append(seconds)
+        else:
+            stats.failures += 1
+
+
+# Per-host metrics: {host: {"requests", "successes", "failures", "retries", "success_rate", "p50_ms", "p95_ms"}}
+def host_stats():
+    with _stats_lock:
+        return {host: stats.summary() for host, stats in _stats.items()}
+
+
+def print_host_stats():
+    for host, stats in sorted(host_stats().items()):
+        print(f"{host}: {stats['successes']}/{stats['requests']} ok, {stats['retries']} retries, "
+              f"p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms")
+
+
+# Seconds to wait before retry number attempt (0-based), with full jitter
+def backoff_delay(attempt, response=None):
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+# Per-attempt timeout cut down to what is left before give_up (a perf_counter time), if any
+def _within(timeout, give_up):
+    if give_up is None:
+        return timeout
+    remaining = max(give_up - time.perf_counter(), 0.001)
+    if isinstance(timeout, tuple):
+        return tuple(min(part, remaining) for part in timeout)
+    return min(timeout, remaining)
+
+
+# Drop-in replacement for requests.get: pooled, with timeouts and retries on connection
+# errors, timeouts and 429/5xx answers. Like requests.get it returns the last response
+# (whatever its status) and raises only if no response arrived at all.
+# deadline, in seconds, bounds the whole call: each attempt's timeouts are cut to the time
+# left, and no retry is made whose backoff would run past it.
+def http_get(url, params=None, headers=None, timeout=None, retries=RETRIES, stream=False, deadline=None):
+    import requests
+    session = get_session()
+    host = urlsplit(url).hostname
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    retried = 0
+    start = time.perf_counter()
+    give_up = start + deadline if deadline is not None else None
+    for attempt in range(retries + 1):
+        response = None
+        error = None
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=_within(timeout, give_up),
+                                    stream=stream)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        if response is not None and response.status_code not in RETRY_STATUSES:
+            _record(host, time.perf_counter() - start, response.ok, retried)
+            return response
+        delay = backoff_delay(attempt, response)
+        if attempt == retries or (give_up is not None and time.perf_counter() + delay >= give_up):
+            _record(host, time.perf_counter() - start, response is not None and response.ok, retried)
+            if response is None:
+                raise error
+            return response
+        if response is not None:
+            response.close()
+        time.sleep(delay)
+        retried += 1
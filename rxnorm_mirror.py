@@ -0,0 +1,240 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Local copy of the RxNorm release, built from the RRF files of
+# https://www.nlm.nih.gov/research/umls/rxnorm/docs/rxnormfiles.html
+RXNORM_DB = "rxnorm.db"
+
+# Only atoms and relations from these sources are imported; the full release also carries
+# every other vocabulary RxNorm maps to, which the lookups here never use
+SOURCES = ("RXNORM",)
+
+# Rows written per transaction; progress is saved with each one so an interrupted import resumes
+BATCH_SIZE = 50_000
+
+# Term types of actual drug products (clinical / branded drugs and packs), which is what the
+# RxNav drugs.json API answers with
+DRUG_TTYS = ("SCD", "SBD", "GPCK", "BPCK")
+
+# How many relation hops to follow from a matched ingredient or brand to its drug products
+# (ingredient -> clinical drug component -> clinical drug)
+MAX_HOPS = 2
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS concepts (
+    id INTEGER PRIMARY KEY,
+    rxaui TEXT UNIQUE NOT NULL,
+    rxcui TEXT NOT NULL,
+    tty TEXT NOT NULL,
+    name TEXT NOT NULL,
+    release TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS concepts_by_rxcui ON concepts (rxcui, tty);
+CREATE TABLE IF NOT EXISTS relations (
+    rxcui1 TEXT NOT NULL,
+    rela TEXT NOT NULL,
+    rxcui2 TEXT NOT NULL,
+    release TEXT NOT NULL,
+    PRIMARY KEY (rxcui1, rela, rxcui2)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS relations_by_rxcui2 ON relations (rxcui2, rxcui1);
+CREATE VIRTUAL TABLE IF NOT EXISTS concept_names USING fts5(name, content='concepts', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS concepts_ai AFTER INSERT ON concepts BEGIN
+    INSERT INTO concept_names (rowid, name) VALUES (new.id, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS concepts_ad AFTER DELETE ON concepts BEGIN
+    INSERT INTO concept_names (concept_names, rowid, name) VALUES ('delete', old.id, old.name);
+END;
+CREATE TRIGGER IF NOT EXISTS concepts_au AFTER UPDATE OF name ON concepts WHEN old.name != new.name BEGIN
+    INSERT INTO concept_names (concept_names, rowid, name) VALUES ('delete', old.id, old.name);
+    INSERT INTO concept_names (rowid, name) VALUES (new.id, new.name);
+END;
+'''
+
+
+# RXNCONSO.RRF row -> concepts row, or None for atoms that are not imported
+def _concept_row(fields, release):
+    rxcui, lat, rxaui, sab, tty, name, suppress = (fields[0], fields[1], fields[7], fields[11], fields[12],
+                                                   fields[14], fields[16])
+    if lat != "ENG" or sab not in SOURCES or suppress != "N":
+        return None
+    return rxaui, rxcui, tty, name, release
+
+
+# RXNREL.RRF row -> relations row, or None for relations that are not imported
+def _relation_row(fields, release):
+    rxcui1, rxcui2, rela, sab = fields[0], fields[4], fields[7], fields[10]
+    if not rxcui1 or not rxcui2 or not rela or sab not in SOURCES:
+        return None
+    return rxcui1, rela, rxcui2, release
+
+
+RRF_TABLES = {
+    "RXNCONSO.RRF": (_concept_row, '''
+        INSERT INTO concepts (rxaui, rxcui, tty, name, release) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (rxaui) DO UPDATE SET rxcui = excluded.rxcui, tty = excluded.tty, name = excluded.name,
+            release = excluded.release
+        WHERE concepts.rxcui != excluded.rxcui OR concepts.tty != excluded.tty OR concepts.name != excluded.name
+            OR concepts.release != excluded.release
+    ''', "concepts"),
+    "RXNREL.RRF": (_relation_row, '''
+        INSERT INTO relations (rxcui1, rela, rxcui2, release) VALUES (?, ?, ?, ?)
+        ON CONFLICT DO UPDATE SET release = excluded.release
+    ''', "relations"),
+}
+
+
+def _get_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+# Import one RRF file, resuming from the last saved offset if the same file was interrupted.
+# Rows are upserted and tagged with the file's release signature; rows the new release no longer
+# has are removed once the whole file is in. Returns the number of rows written.
+def _import_file(conn, file_path, file_name, batch_size):
+    make_row, insert_sql, table = RRF_TABLES[file_name]
+    stat = os.stat(file_path)
+    release = f"{stat.st_size}:{stat.st_mtime_ns}"
+    if _get_meta(conn, f"{file_name}:done") == release:
+        return 0
+
+    offset = 0
+    if _get_meta(conn, f"{file_name}:release") == release:
+        offset = int(_get_meta(conn, f"{file_name}:offset") or 0)
+    else:
+        with conn:
+            _set_meta(conn, f"{file_name}:release", release)
+            _set_meta(conn, f"{file_name}:offset", "0")
+
+    written = 0
+    with open(file_path, "rb") as f:
+        f.seek(offset)
+        batch = []
+        while True:
+            line = f.readline()
+            if line:
+                offset += len(line)
+                row = make_row(line.decode("utf-8").rstrip("\r\n").split("|"), release)
+                if row is not None:
+                    batch.append(row)
+            if len(batch) >= batch_size or (not line and batch):
+                with conn:
+                    conn.executemany(insert_sql, batch)
+                    _set_meta(conn, f"{file_name}:offset", str(offset))
+                written += len(batch)
+                batch = []
+            if not line:
+                break
+
+    with conn:
+        conn.execute(f"DELETE FROM {table} WHERE release != ?", (release,))
+        _set_meta(conn, f"{file_name}:done", release)
+    return written
+
+
+# Import (or update from) an unpacked RxNorm release. rrf_dir is the release's rrf/ directory.
+# Files already imported from the same release are skipped and interrupted imports resume,
+# so this can simply be rerun until it completes, and again for every new monthly release.
+def import_rrf(rrf_dir, path=RXNORM_DB, batch_size=BATCH_SIZE):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.executescript(SCHEMA)
+        counts = {}
+        for file_name in RRF_TABLES:
+            file_path = os.path.join(rrf_dir, file_name)
+            if os.path.exists(file_path):
+                counts[file_name] = _import_file(conn, file_path, file_name, batch_size)
+        conn.execute("INSERT INTO concept_names (concept_names) VALUES ('optimize')")
+        conn.commit()
+        return counts
+    finally:
+        conn.close()
+
+
+_local = threading.local()
+
+
+# True once an import has finished loading drug names into the mirror
+def mirror_available(path=RXNORM_DB):
+    if not os.path.exists(path):
+        return False
+    try:
+        return _get_meta(_connection(path), "RXNCONSO.RRF:done") is not None
+    except sqlite3.Error:
+        return False
+
+
+# Read-only connection to the mirror, one per thread
+def _connection(path=RXNORM_DB):
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    if path not in connections:
+        connections[path] = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    return connections[path]
+
+
+# Run a query with an "IN ({ids})" list over many IDs, a chunk at a time to stay under SQLite's variable limit
+def _query_ids(conn, sql, ids, params=(), chunk_size=500):
+    ids = list(ids)
+    rows = []
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        placeholders = ",".join("?" * len(chunk))
+        rows.extend(conn.execute(sql.format(ids=placeholders), chunk * sql.count("{ids}") + list(params)))
+    return rows
+
+
+# Drug product names for a drug, ingredient or brand name, like RxNav's drugs.json?name= lookup:
+# full-text match on concept names, then relations out to clinical and branded drugs
+def find_drugs(name, limit=5, path=RXNORM_DB):
+    words = name.replace('"', " ").split()
+    if not words:
+        return []
+    conn = _connection(path)
+    matched = conn.execute('''
+        SELECT DISTINCT c.rxcui FROM concept_names JOIN concepts c ON c.id = concept_names.rowid
+        WHERE concept_names MATCH ? ORDER BY concept_names.rank LIMIT 50
+    ''', (" ".join(f'"{word}"' for word in words),)).fetchall()
+
+    frontier = {rxcui for (rxcui,) in matched}
+    seen = set(frontier)
+    drugs = set()
+    drug_ttys = ",".join("?" * len(DRUG_TTYS))
+    for hop in range(MAX_HOPS + 1):
+        drugs.update(name for (name,) in _query_ids(
+            conn, f"SELECT name FROM concepts WHERE rxcui IN ({{ids}}) AND tty IN ({drug_ttys})", frontier, DRUG_TTYS))
+        if hop == MAX_HOPS or len(drugs) >= limit:
+            break
+        neighbours = _query_ids(conn, '''
+            SELECT rxcui2 FROM relations WHERE rxcui1 IN ({ids})
+            UNION SELECT rxcui1 FROM relations WHERE rxcui2 IN ({ids})
+        ''', frontier)
+        frontier = {rxcui for (rxcui,) in neighbours} - seen
+        seen |= frontier
+    return sorted(drugs)[:limit]
+
+
+# python rxnorm_mirror.py RRF_DIR [rxnorm.db]
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python rxnorm_mirror.py RRF_DIR [rxnorm.db]")
+    start = time.perf_counter()
+    counts = import_rrf(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else RXNORM_DB)
+    for file_name, count in counts.items():
+        print(f"{file_name}: {count} rows imported")
+    print(f"Done in {time.perf_counter() - start:.1f}s")
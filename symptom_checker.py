@@ -1,8 +1,7 @@
 import json
 import tkinter as tk
 from tkinter import messagebox, ttk
-import requests
-from bs4 import BeautifulSoup
+from page_scrape import scrape_page
 import webbrowser
 import matplotlib.pyplot as plt
 
@@ -34,20 +33,15 @@ def save_users(users):
 # === FUNCTION TO SCRAPE MEDICINES === #
 def get_medicines_for_disease(disease):
     search_url = f"https://www.webmd.com/search/search_results/default.aspx?query={disease} medicine"
-    response = requests.get(search_url)
-    soup = BeautifulSoup(response.text, "html.parser")
 
-    medicines = []
-
-    # Find medicine names by searching for specific classes in WebMD
-    for div in soup.find_all("div", class_="search-results-doc-title"):
-        title = div.text.strip()
-        link = div.find("a")["href"] if div.find("a") else "#"
-
-        if "drug" in title.lower() or "medication" in title.lower():
-            medicines.append((title, "https://www.webmd.com" + link))
-
-    return medicines[:3]  # Return top 3 medicines
+    # Find medicine names by searching for specific classes in WebMD, stopping at the top 3
+    try:
+        matches = scrape_page(search_url, ["div"], ["drug", "medication"], class_="search-results-doc-title")
+    except Exception as e:
+        # Still show the diagnosis, just without medicines
+        print(f"Error fetching medicines: {e}")
+        return []
+    return [(title, "https://www.webmd.com" + (link or "#")) for title, link in matches][:3]  # Return top 3 medicines
 
 
 # === LOGIN FUNCTION === #
@@ -0,0 +1,888 @@
+import heapq
+import math
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+NLP_MODEL = "en_core_web_sm"
+
+# What gets loaded to tokenize user text:
+#   "full"      - the whole en_core_web_sm pipeline (tagger, parser, NER, lemmatizer)
+#   "lemma"     - tokenizer plus the tagger/lemmatizer chain, matching also tries token lemmas
+#   "tokenizer" - spaCy's English tokenizer only, no model weights
+#   "regex"     - plain regex tokenizer, spaCy is never imported
+EXTRACTION_PROFILES = ("full", "lemma", "tokenizer", "regex")
+EXTRACTION_PROFILE = "full"
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Largest edit distance used to correct misspelled symptom words ("hedache" -> "headache").
+# Set to 0 before loading the database to turn typo correction off.
+FUZZY_MAX_DISTANCE = 2
+
+# Shorter words are never corrected: too many real words ("couch", "fewer", "tires") are one
+# edit away from a short symptom word
+FUZZY_MIN_LENGTH = 6
+
+# Frequent English words, one per line; a word listed here is spelled right and never
+# "corrected" into a symptom ("chilli" is not "chills")
+COMMON_WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "common_words.txt")
+
+# Curated ways patients describe a canonical symptom. Only entries whose canonical
+# symptom is in the loaded database are used.
+SYMPTOM_SYNONYMS = {
+    "cough": ["coughing up", "hacking"],
+    "sneezing": ["sneezy"],
+    "runny nose": ["running nose", "nose running", "nose is running", "stuffy nose", "blocked nose"],
+    "sore throat": ["throat hurts", "throat is sore", "scratchy throat", "throat pain"],
+    "fever": ["feverish", "high temperature", "febrile"],
+    "chills": ["shivering", "shivers", "feel cold"],
+    "body ache": ["aching", "achy", "body pain", "body hurts", "muscle pain", "muscle ache"],
+    "fatigue": ["tired", "exhausted", "exhaustion", "weakness", "no energy"],
+    "headache": ["head hurts", "head is hurting", "head ache", "head pain", "pounding head"],
+    "nausea": ["nauseous", "nauseated", "feel sick", "queasy", "want to vomit"],
+    "light sensitivity": ["sensitive to light", "light hurts my eyes", "photophobia"],
+    "itchy eyes": ["eyes itch", "eyes are itchy", "itching eyes"],
+}
+
+# How diagnose() scores illnesses:
+#   "index"  - count overlaps through the inverted symptom -> illness index
+#   "bitset" - popcount of the query mask against every illness mask
+#   "bayes"  - naive Bayes log-likelihood from precomputed tables: symptoms an illness does not
+#              list count against it, and illnesses listing many symptoms explain each one less
+DIAGNOSE_STRATEGIES = ("index", "bitset", "bayes")
+
+# Laplace smoothing for the naive Bayes weights
+NAIVE_BAYES_ALPHA = 1.0
+
+# Patients scored per dense block in diagnose_batch
+DIAGNOSE_BATCH_CHUNK = 1024
+
+# Chunks queued per worker process in extract_symptoms_batch(n_process > 1)
+BATCH_CHUNKS_IN_FLIGHT = 4
+
+# How many distinct complaints / symptom sets are memoized
+EXTRACT_CACHE_SIZE = 1024
+DIAGNOSE_CACHE_SIZE = 1024
+
+_nlp = None
+_nlp_lock = threading.Lock()
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+
+
+# Split a phrase or a piece of text into lowercase word tokens
+def tokenize_phrase(phrase):
+    return phrase.lower().split()
+
+
+# Word forms a symptom word may appear in ("cough" -> "coughs", "coughing", "coughed", ...).
+# Plain suffix rules, so no model is needed; forms that are not real words never match anything.
+# A plural symptom's singular often means something else ("chills" -> "chilling", "chilly"), so
+# forms built on a stripped plural are dropped when they are in common_words.
+def inflections(word, common_words=frozenset()):
+    stems = {word}
+    plural_stem = None
+    if word.endswith("ing") and len(word) > 5:
+        stems.update((word[:-3], word[:-3] + "e"))
+    elif word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        plural_stem = word[:-1]
+    forms = set()
+    for stem in stems:
+        forms.update(_suffixed(stem))
+    if plural_stem is not None:
+        forms.update(form for form in _suffixed(plural_stem) if form not in common_words)
+    return forms
+
+
+def _suffixed(stem):
+    forms = {stem, stem + "s", stem + "es", stem + "ed", stem + "ing", stem + "y", stem + "ish"}
+    if stem.endswith("e"):
+        forms.update((stem[:-1] + "ing", stem[:-1] + "y", stem + "d"))
+    return forms
+
+
+# Token trie over every symptom phrase, so "runny nose" and "body ache" match as one symptom.
+# Each phrase maps to the canonical symptom it stands for; the first phrase added wins.
+class PhraseIndex:
+    def __init__(self, phrases=()):
+        self.root = {}
+        self.max_length = 0
+        self.words = set()
+        for phrase in phrases:
+            self.add(phrase)
+
+    def add(self, phrase, canonical=None):
+        tokens = tokenize_phrase(phrase)
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(None, canonical or " ".join(tokens))
+        self.words.update(tokens)
+        self.max_length = max(self.max_length, len(tokens))
+
+    # Find every symptom phrase in a token list (leftmost-longest, one pass).
+    # If lemmas are given, a token that does not match is retried as its lemma.
+    def match(self, tokens, lemmas=None):
+        found = []
+        i = 0
+        while i < len(tokens):
+            node = self.root
+            best = None
+            best_end = i
+            j = i
+            while j < len(tokens):
+                nxt = node.get(tokens[j])
+                if nxt is None and lemmas is not None:
+                    nxt = node.get(lemmas[j])
+                if nxt is None:
+                    break
+                node = nxt
+                j += 1
+                if None in node:
+                    best = node[None]
+                    best_end = j
+            if best is None:
+                i += 1
+            else:
+                found.append(best)
+                i = best_end
+        return found
+
+
+# Edit distance (insert, delete, substitute, swap adjacent letters), giving up above max_distance
+def edit_distance(a, b, max_distance):
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+# Every string reachable from word by deleting up to max_distance letters
+def _deletes(word, max_distance):
+    found = {word}
+    frontier = [word]
+    for _ in range(max_distance):
+        next_frontier = []
+        for item in frontier:
+            for i in range(len(item)):
+                shorter = item[:i] + item[i + 1:]
+                if shorter not in found:
+                    found.add(shorter)
+                    next_frontier.append(shorter)
+        frontier = next_frontier
+    return found
+
+
+# Words of the common-word list, or an empty set if the file is missing
+def load_common_words(path=COMMON_WORDS_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return frozenset(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    except FileNotFoundError:
+        return frozenset()
+
+
+# SymSpell-style deletion dictionary over the words used in symptom phrases.
+# A lookup only generates the deletes of the query word, so its cost does not grow with the vocabulary.
+# Words in common_words are real words, so they are never corrected.
+class FuzzyIndex:
+    def __init__(self, words, max_distance, common_words=()):
+        self.words = set(words)
+        self.max_distance = max_distance
+        self.common_words = frozenset(common_words) - self.words
+        self.deletes = {}
+        for word in sorted(self.words):
+            for item in _deletes(word, max_distance):
+                self.deletes.setdefault(item, []).append(word)
+
+    # Longer words are allowed more typos: none below FUZZY_MIN_LENGTH letters, 1 up to 8 letters, then 2
+    def allowed_distance(self, word):
+        if len(word) < FUZZY_MIN_LENGTH:
+            return 0
+        return min(self.max_distance, 1 if len(word) < 9 else 2)
+
+    # Closest vocabulary word for a (possibly misspelled) word, or None
+    def lookup(self, word):
+        if word in self.words:
+            return word
+        if word in self.common_words:
+            return None
+        max_distance = self.allowed_distance(word)
+        if max_distance <= 0:
+            return None
+
+        best = None
+        best_distance = max_distance + 1
+        checked = set()
+        for item in _deletes(word, max_distance):
+            for candidate in self.deletes.get(item, ()):
+                # Typos almost never hit the first letter; this keeps "never" from turning into "fever"
+                if candidate in checked or candidate[0] != word[0]:
+                    continue
+                checked.add(candidate)
+                if abs(len(candidate) - len(word)) > min(best_distance, max_distance):
+                    continue
+                distance = edit_distance(word, candidate, max_distance)
+                if distance > max_distance:
+                    continue
+                if distance < best_distance or (distance == best_distance and candidate < best):
+                    best = candidate
+                    best_distance = distance
+        return best
+
+    # Replace every misspelled token that is close to a vocabulary word.
+    # Tokens in known (default: the indexed words) are left alone.
+    def correct(self, tokens, known=None):
+        known = self.words if known is None else known
+        corrected = []
+        for token in tokens:
+            if token in known:
+                corrected.append(token)
+            else:
+                corrected.append(self.lookup(token) or token)
+        return corrected
+
+
+# Bounded least-recently-used cache tied to one knowledge base version.
+# Looking up with a different version empties it first, so results never outlive the database they came from.
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.version = None
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, version, key):
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, version, key, value):
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            if version != self.version:
+                return
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "size": len(self.entries), "maxsize": self.maxsize}
+
+
+_extract_cache = LRUCache(EXTRACT_CACHE_SIZE)
+_diagnose_cache = LRUCache(DIAGNOSE_CACHE_SIZE)
+
+
+# Hit/miss/eviction counters of the extraction and diagnosis caches
+def cache_stats():
+    return {"extract": _extract_cache.stats(), "diagnose": _diagnose_cache.stats()}
+
+
+# Compiled, read-only view of an ILLNESS_DATABASE dict.
+# Every synonym and word form is resolved to its canonical symptom here, at load time,
+# so matching user text is still a single walk over the phrase trie.
+class KnowledgeBase:
+    def __init__(self, database, version, fuzzy_distance=0, synonyms=None):
+        self.version = version
+        self.database = database
+        self.fuzzy_distance = fuzzy_distance
+        self.synonyms = synonyms
+
+        # Illness ID = position in the database, symptom ID = position in the vocabulary.
+        # A compiled store (kb_store.IllnessStore) hands these over directly.
+        if hasattr(database, "compiled"):
+            self.illness_names, symptom_names, self.illness_symptoms, self.postings = database.compiled()
+            self.vocabulary = {symptom: symptom_id for symptom_id, symptom in enumerate(symptom_names)}
+        else:
+            self._index_database(database)
+        self.illness_sizes = [len(symptom_ids) for symptom_ids in self.illness_symptoms]
+
+        # The phrase trie, typo index, naive Bayes weights, bitmasks and matrix are built on
+        # first use (or by warm()), so a large knowledge base is usable as soon as its IDs and
+        # postings are loaded
+        self._phrases = None
+        self._fuzzy = None
+        self._log_likelihoods = None
+        self._illness_masks = None
+        self._matrix = None
+        self._build_lock = threading.RLock()
+
+    # Assign IDs and build the inverted index (symptom ID -> IDs of the illnesses listing it)
+    def _index_database(self, database):
+        self.illness_names = []
+        self.illness_symptoms = []
+        self.vocabulary = {}
+        for illness, data in database.items():
+            symptoms = data["symptoms"] if isinstance(data, dict) else data
+            symptom_ids = []
+            for symptom in symptoms:
+                symptom_id = self.vocabulary.setdefault(" ".join(tokenize_phrase(symptom)), len(self.vocabulary))
+                if symptom_id not in symptom_ids:
+                    symptom_ids.append(symptom_id)
+            self.illness_names.append(illness)
+            self.illness_symptoms.append(symptom_ids)
+
+        self.postings = [[] for _ in self.vocabulary]
+        for illness_id, symptom_ids in enumerate(self.illness_symptoms):
+            for symptom_id in symptom_ids:
+                self.postings[symptom_id].append(illness_id)
+
+    # Build a lazily created part once, even when several threads ask for it at the same time
+    def _lazy(self, attribute, build):
+        value = getattr(self, attribute)
+        if value is None:
+            with self._build_lock:
+                value = getattr(self, attribute)
+                if value is None:
+                    value = build()
+                    setattr(self, attribute, value)
+        return value
+
+    # Phrase trie with every synonym and word form resolved to its canonical symptom
+    @property
+    def phrases(self):
+        return self._lazy("_phrases", self._build_phrases)
+
+    def _build_phrases(self):
+        phrases = PhraseIndex(self.vocabulary)
+        if self.synonyms is not None:
+            for canonical, variants in self.synonyms.items():
+                if canonical in self.vocabulary:
+                    for variant in variants:
+                        phrases.add(variant, canonical)
+            common_words = load_common_words()
+            for canonical in self.vocabulary:
+                tokens = tokenize_phrase(canonical)
+                for form in inflections(tokens[-1], common_words):
+                    phrases.add(" ".join(tokens[:-1] + [form]), canonical)
+        return phrases
+
+    # Typo index over the words of the canonical symptoms, plus the synonym words that are
+    # distinctive enough to correct towards: long enough to be corrected themselves and not
+    # everyday words ("tired", "feel", "sick" would turn typos of ordinary words into symptoms).
+    # Generated word forms are left out; they multiply the index size for little gain.
+    # None when turned off.
+    @property
+    def fuzzy(self):
+        if self.fuzzy_distance <= 0:
+            return None
+        return self._lazy("_fuzzy", self._build_fuzzy)
+
+    def _build_fuzzy(self):
+        common_words = load_common_words()
+        words = {word for symptom in self.vocabulary for word in tokenize_phrase(symptom)}
+        if self.synonyms is not None:
+            for canonical, variants in self.synonyms.items():
+                if canonical in self.vocabulary:
+                    words.update(word for variant in variants for word in tokenize_phrase(variant)
+                                 if len(word) >= FUZZY_MIN_LENGTH and word not in common_words)
+        return FuzzyIndex(words, self.fuzzy_distance, common_words)
+
+    # Each illness profile as an int whose bit n is set when it lists symptom ID n
+    @property
+    def illness_masks(self):
+        return self._lazy("_illness_masks", self._build_masks)
+
+    def _build_masks(self):
+        masks = []
+        for symptom_ids in self.illness_symptoms:
+            mask = 0
+            for symptom_id in symptom_ids:
+                mask |= 1 << symptom_id
+            masks.append(mask)
+        return masks
+
+    # Naive Bayes tables, indexed by illness ID: (log P(s | illness) for a symptom s it lists,
+    # log P(s | illness) for a symptom it does not list)
+    @property
+    def log_likelihoods(self):
+        return self._lazy("_log_likelihoods", self._log_likelihood_tables)
+
+    # True once everything extraction needs is built, so match() will not wait on a build. Never blocks.
+    def ready(self):
+        return self._phrases is not None and (self.fuzzy_distance <= 0 or self._fuzzy is not None)
+
+    # Build everything extraction and the default diagnosis need, ahead of the first request.
+    # full=True also builds the naive Bayes weights and bitmasks of the other diagnose strategies
+    # (not the sparse matrix, which needs scipy and is only used by diagnose_batch).
+    def warm(self, full=False):
+        self.phrases
+        self.fuzzy
+        if full:
+            self.log_likelihoods
+            self.illness_masks
+        return self
+
+    # P(symptom | illness), Laplace-smoothed with NAIVE_BAYES_ALPHA over the illness's n symptoms:
+    # (1 + alpha) / (n + 2 alpha) for a symptom it lists, alpha / (n + 2 alpha) for one it does not.
+    # Each entry of the symptom x illness table is one of those two values for its illness, so
+    # the table is kept as these two columns.
+    def _log_likelihood_tables(self):
+        alpha = NAIVE_BAYES_ALPHA
+        listed = array("d", (math.log((1 + alpha) / (size + 2 * alpha)) for size in self.illness_sizes))
+        unlisted = array("d", (math.log(alpha / (size + 2 * alpha)) for size in self.illness_sizes))
+        return listed, unlisted
+
+    # Naive Bayes log-likelihood of the query symptoms (the known ones) for every illness sharing
+    # at least one: listed symptoms add the illness's listed weight, every other query symptom
+    # its unlisted weight, so a symptom an illness lacks counts against it
+    def log_likelihood_scores(self, symptoms):
+        symptoms = {symptom for symptom in symptoms if symptom in self.vocabulary}
+        listed, unlisted = self.log_likelihoods
+        return {illness_id: shared * listed[illness_id] + (len(symptoms) - shared) * unlisted[illness_id]
+                for illness_id, shared in self.overlap_counts(symptoms).items()}
+
+    # Illness with the highest naive Bayes score, or None if no symptom matches; earlier illnesses win ties
+    def best_match_bayes(self, symptoms):
+        scores = self.log_likelihood_scores(set(symptoms))
+        if not scores:
+            return None
+        best_id = min(scores, key=lambda illness_id: (-scores[illness_id], illness_id))
+        return self.illness_names[best_id]
+
+    # Number of shared symptoms for every illness sharing at least one, from the inverted index
+    def overlap_counts(self, symptoms):
+        counts = {}
+        for symptom in symptoms:
+            symptom_id = self.vocabulary.get(symptom)
+            if symptom_id is None:
+                continue
+            for illness_id in self.postings[symptom_id]:
+                counts[illness_id] = counts.get(illness_id, 0) + 1
+        return counts
+
+    # Illness sharing the most symptoms with a symptom set, or None; earlier illnesses win ties
+    def best_match(self, symptoms):
+        counts = self.overlap_counts(set(symptoms))
+        if not counts:
+            return None
+        best_id = min(counts, key=lambda illness_id: (-counts[illness_id], illness_id))
+        return self.illness_names[best_id]
+
+    # Bitmask of a symptom set; unknown symptoms are ignored
+    def symptom_mask(self, symptoms):
+        mask = 0
+        for symptom in symptoms:
+            symptom_id = self.vocabulary.get(symptom)
+            if symptom_id is not None:
+                mask |= 1 << symptom_id
+        return mask
+
+    # Same result as best_match, scored as popcount(query & illness) over the illness bitmasks
+    def best_match_bitset(self, symptoms):
+        query = self.symptom_mask(symptoms)
+        best_id = None
+        best_match_count = 0
+        for illness_id, mask in enumerate(self.illness_masks):
+            count = (query & mask).bit_count()
+            if count > best_match_count:
+                best_match_count = count
+                best_id = illness_id
+        return None if best_id is None else self.illness_names[best_id]
+
+    # Best k illnesses as (illness, score) pairs, highest score first, earlier illnesses win ties.
+    #   "jaccard"  - shared / (query symptoms + illness symptoms - shared)
+    #   "coverage" - shared / illness symptoms
+    # Only illnesses sharing a symptom are scored, and a k-sized heap keeps the best ones.
+    def top_matches(self, symptoms, k, scoring="jaccard"):
+        symptoms = set(symptoms)
+        return self.rank_counts(self.overlap_counts(symptoms), len(symptoms), k, scoring)
+
+    # top_matches for overlap counts that are already known (see DiagnosisSession)
+    def rank_counts(self, counts, query_size, k, scoring="jaccard"):
+        if scoring == "jaccard":
+            def score(illness_id):
+                shared = counts[illness_id]
+                return shared / (query_size + self.illness_sizes[illness_id] - shared)
+        elif scoring == "coverage":
+            def score(illness_id):
+                return counts[illness_id] / self.illness_sizes[illness_id]
+        else:
+            raise ValueError(f"Unknown scoring {scoring!r}, expected 'jaccard' or 'coverage'")
+
+        best = heapq.nlargest(k, ((score(i), -i) for i in counts))
+        return [(self.illness_names[-negative_id], value) for value, negative_id in best]
+
+    # Sparse binary illness x symptom matrix, built on first use (needs numpy and scipy)
+    def incidence_matrix(self):
+        return self._lazy("_matrix", self._build_matrix)
+
+    def _build_matrix(self):
+        import numpy as np
+        from scipy import sparse
+        rows, cols = [], []
+        for symptom_id, illness_ids in enumerate(self.postings):
+            rows.extend(illness_ids)
+            cols.extend([symptom_id] * len(illness_ids))
+        data = np.ones(len(rows), dtype=np.int32)
+        shape = (len(self.illness_names), len(self.vocabulary))
+        return sparse.csr_matrix((data, (rows, cols)), shape=shape)
+
+    # Sparse binary patient x symptom matrix for lists of symptoms; unknown symptoms are ignored
+    def patient_matrix(self, patients):
+        import numpy as np
+        from scipy import sparse
+        indptr = [0]
+        indices = []
+        for symptoms in patients:
+            ids = {self.vocabulary[s] for s in symptoms if s in self.vocabulary}
+            indices.extend(sorted(ids))
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.int32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(self.vocabulary)))
+
+    # Dense integer ID of a canonical symptom
+    def symptom_id(self, symptom):
+        return self.vocabulary[symptom]
+
+    # Find symptom phrases in tokenized text, correcting typos first when enabled
+    def match(self, tokens, lemmas=None):
+        phrases = self.phrases
+        fuzzy = self.fuzzy
+        if fuzzy is not None:
+            tokens = fuzzy.correct(tokens, phrases.words)
+        return phrases.match(tokens, lemmas)
+
+
+_kb_lock = threading.Lock()
+_kb_version = 0
+_active_kb = None
+
+
+# Compile ILLNESS_DATABASE into a new knowledge base without making it active.
+# normalize=False matches only the exact symptom strings, without synonyms or word forms.
+def build_knowledge_base(database, fuzzy_distance=None, normalize=True):
+    global _kb_version
+    if fuzzy_distance is None:
+        fuzzy_distance = FUZZY_MAX_DISTANCE
+    synonyms = SYMPTOM_SYNONYMS if normalize else None
+    with _kb_lock:
+        _kb_version += 1
+        version = _kb_version
+    return KnowledgeBase(database, version, fuzzy_distance, synonyms)
+
+
+# Make a fully built knowledge base the active one. This is a single reference swap: calls
+# already running keep the snapshot they started with, new calls see the new one. A snapshot
+# older than the active one (a slower concurrent rebuild) is ignored. Returns True if installed.
+def install_knowledge_base(kb):
+    global _active_kb
+    with _kb_lock:
+        if _active_kb is not None and kb.version < _active_kb.version:
+            return False
+        _active_kb = kb
+        return True
+
+
+# Compile ILLNESS_DATABASE and make it the active knowledge base
+def load_illness_database(database, fuzzy_distance=None, normalize=True):
+    kb = build_knowledge_base(database, fuzzy_distance, normalize)
+    install_knowledge_base(kb)
+    return kb
+
+
+# Get the active knowledge base
+def get_knowledge_base():
+    if _active_kb is None:
+        raise RuntimeError("No illness database loaded, call load_illness_database() first")
+    return _active_kb
+
+
+# Match symptom phrases in already tokenized text
+def match_symptoms(tokens, kb=None):
+    kb = kb or get_knowledge_base()
+    return kb.match([token.lower() for token in tokens])
+
+
+# Choose which extraction profile is used (drops any model loaded for another profile)
+def set_extraction_profile(profile):
+    global EXTRACTION_PROFILE, _nlp
+    if profile not in EXTRACTION_PROFILES:
+        raise ValueError(f"Unknown extraction profile {profile!r}, expected one of {EXTRACTION_PROFILES}")
+    with _nlp_lock:
+        if profile != EXTRACTION_PROFILE:
+            EXTRACTION_PROFILE = profile
+            _nlp = None
+            _extract_cache.clear()
+
+
+# Load the spaCy pipeline for a profile, with only the components it needs
+def load_nlp(profile):
+    import spacy
+    if profile == "full":
+        return spacy.load(NLP_MODEL)
+    if profile == "lemma":
+        return spacy.load(NLP_MODEL, exclude=["parser", "ner", "senter"])
+    return spacy.blank("en")
+
+
+# Get the spaCy model for the current profile, loading it on first use.
+# If the background warm-up is still loading it, this waits for it instead of loading twice.
+def get_nlp():
+    global _nlp
+    if EXTRACTION_PROFILE == "regex":
+        raise RuntimeError("The regex extraction profile does not use spaCy")
+    nlp = _nlp
+    if nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                _nlp = load_nlp(EXTRACTION_PROFILE)
+            nlp = _nlp
+    return nlp
+
+
+# Check whether the model is loaded, without blocking
+def nlp_ready():
+    return EXTRACTION_PROFILE == "regex" or _nlp is not None
+
+
+# Start loading the spaCy model on a daemon thread so the UI can open right away
+def warm_nlp_in_background():
+    global _warmup_thread
+    if nlp_ready():
+        return None
+    with _warmup_lock:
+        if _warmup_thread is None or not _warmup_thread.is_alive():
+            _warmup_thread = threading.Thread(target=_warm_nlp, name="nlp-warmup", daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
+
+
+def _warm_nlp():
+    try:
+        get_nlp()
+    except Exception as e:
+        # extract_symptoms will retry the load and surface the error to the caller
+        print(f"Error loading NLP model: {e}")
+
+
+# Turn a processed spaCy doc into (tokens, lemmas) for the phrase matcher
+def _doc_tokens(doc):
+    tokens = [token.text for token in doc]
+    if EXTRACTION_PROFILE == "lemma":
+        return tokens, [token.lemma_ for token in doc]
+    return tokens, None
+
+
+# Tokenize user text with the current profile
+def tokenize_text(user_text):
+    text = user_text.lower()
+    if EXTRACTION_PROFILE == "regex":
+        return WORD_PATTERN.findall(text), None
+    return _doc_tokens(get_nlp()(text))
+
+
+# Extract symptoms from user input, memoized on the whitespace/case-normalized text
+def extract_symptoms(user_text):
+    kb = get_knowledge_base()
+    key = " ".join(user_text.lower().split())
+    symptoms = _extract_cache.get(kb.version, key)
+    if symptoms is None:
+        tokens, lemmas = tokenize_text(key)
+        symptoms = tuple(kb.match(tokens, lemmas))
+        _extract_cache.put(kb.version, key, symptoms)
+    return list(symptoms)
+
+
+# Diagnose illness: the one sharing the most symptoms, earlier illnesses win ties
+def diagnose(symptoms, strategy="index"):
+    kb = get_knowledge_base()
+    key = (frozenset(symptoms), strategy)
+    found = _diagnose_cache.get(kb.version, key)
+    if found is None:
+        if strategy == "index":
+            found = (kb.best_match(key[0]),)
+        elif strategy == "bitset":
+            found = (kb.best_match_bitset(key[0]),)
+        elif strategy == "bayes":
+            found = (kb.best_match_bayes(key[0]),)
+        else:
+            raise ValueError(f"Unknown diagnose strategy {strategy!r}, expected one of {DIAGNOSE_STRATEGIES}")
+        _diagnose_cache.put(kb.version, key, found)
+    return found[0]
+
+
+# Ranked differential diagnosis: up to k (illness, score) pairs with scores between 0 and 1.
+# Pass kb to score against a snapshot the caller already holds.
+def diagnose_topk(symptoms, k=3, scoring="jaccard", kb=None):
+    kb = kb or get_knowledge_base()
+    key = (frozenset(symptoms), k, scoring)
+    ranked = _diagnose_cache.get(kb.version, key)
+    if ranked is None:
+        ranked = tuple(kb.top_matches(key[0], k, scoring))
+        _diagnose_cache.put(kb.version, key, ranked)
+    return list(ranked)
+
+
+# Extract symptoms from many texts, streamed through nlp.pipe; results come back in input order.
+# Matching only reads token text (and lemmas in the "lemma" profile), so every other
+# pipeline component is skipped for the batch.
+# With n_process > 1, chunks of batch_size texts are tokenized *and* matched in worker
+# processes, each with its own copy of the knowledge base, and only the symptom lists come
+# back; at most n_process * BATCH_CHUNKS_IN_FLIGHT chunks are held in memory at a time.
+def extract_symptoms_batch(texts, batch_size=1000, n_process=1):
+    kb = get_knowledge_base()
+    if n_process <= 1:
+        yield from _extract_stream(kb, texts, batch_size)
+        return
+
+    from collections import deque
+    from multiprocessing import Pool
+    # A compiled store is reopened from its file in each worker; a plain dict is sent as is
+    database = getattr(kb.database, "path", None) or dict(kb.database)
+    initargs = (EXTRACTION_PROFILE, database, kb.fuzzy_distance, kb.synonyms is not None)
+    with Pool(n_process, initializer=_init_batch_worker, initargs=initargs) as pool:
+        pending = deque()
+        for chunk in _chunks(texts, batch_size):
+            pending.append(pool.apply_async(_extract_chunk, (chunk,)))
+            if len(pending) >= n_process * BATCH_CHUNKS_IN_FLIGHT:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+# Tokenize and match a stream of texts in this process
+def _extract_stream(kb, texts, batch_size):
+    if EXTRACTION_PROFILE == "regex":
+        for text in texts:
+            yield kb.match(WORD_PATTERN.findall(text.lower()))
+        return
+
+    nlp = get_nlp()
+    disable = [] if EXTRACTION_PROFILE == "lemma" else nlp.pipe_names
+    docs = nlp.pipe((text.lower() for text in texts), batch_size=batch_size, disable=disable)
+    for doc in docs:
+        tokens, lemmas = _doc_tokens(doc)
+        yield kb.match(tokens, lemmas)
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Set up a batch worker process with the parent's profile and knowledge base
+def _init_batch_worker(profile, database, fuzzy_distance, normalize):
+    set_extraction_profile(profile)
+    if isinstance(database, str):
+        import kb_store
+        database = kb_store.IllnessStore(database)
+    load_illness_database(database, fuzzy_distance, normalize).warm()
+
+
+def _extract_chunk(texts):
+    return list(_extract_stream(get_knowledge_base(), texts, len(texts)))
+
+
+# Running diagnosis for text that is being typed. Each update only walks the postings of
+# symptoms that appeared or disappeared since the previous text, and keeps the overlap counts.
+# Extraction bypasses the memo cache: every keystroke is a new prefix that would only push
+# whole complaints out of it.
+class DiagnosisSession:
+    def __init__(self, k=3, scoring="jaccard"):
+        self.k = k
+        self.scoring = scoring
+        self.kb = None
+        self.symptoms = set()
+        self.counts = {}
+
+    def _add(self, symptom, delta):
+        symptom_id = self.kb.vocabulary.get(symptom)
+        if symptom_id is None:
+            return
+        for illness_id in self.kb.postings[symptom_id]:
+            count = self.counts.get(illness_id, 0) + delta
+            if count:
+                self.counts[illness_id] = count
+            else:
+                del self.counts[illness_id]
+
+    # Re-rank for the current text; returns up to k (illness, score) pairs
+    def update(self, user_text):
+        kb = get_knowledge_base()
+        if kb is not self.kb:
+            # A new database was loaded; start over against it
+            self.kb = kb
+            self.symptoms = set()
+            self.counts = {}
+
+        symptoms = set(kb.match(*tokenize_text(user_text)))
+        for symptom in symptoms - self.symptoms:
+            self._add(symptom, 1)
+        for symptom in self.symptoms - symptoms:
+            self._add(symptom, -1)
+        self.symptoms = symptoms
+        return kb.rank_counts(self.counts, len(symptoms), self.k, self.scoring)
+
+
+# Diagnose many patients at once: one sparse product patients x illnesses, then a row-wise argmax.
+# patients is a list of symptom lists or a patient x symptom matrix from KnowledgeBase.patient_matrix.
+# Returns the same winners as diagnose() (None where no symptom matches).
+def diagnose_batch(patients, chunk_size=None):
+    import numpy as np
+    kb = get_knowledge_base()
+    if not hasattr(patients, "tocsr"):
+        patients = kb.patient_matrix(patients)
+    patients = patients.tocsr()
+    chunk_size = chunk_size or DIAGNOSE_BATCH_CHUNK
+    illness_matrix_t = kb.incidence_matrix().T.tocsc()
+    names = np.array(kb.illness_names + [None], dtype=object)
+
+    results = []
+    for start in range(0, patients.shape[0], chunk_size):
+        scores = (patients[start:start + chunk_size] @ illness_matrix_t).toarray()
+        if scores.shape[1] == 0:
+            results.extend([None] * scores.shape[0])
+            continue
+        # argmax returns the first maximum, which is the earlier illness, like diagnose()
+        best = scores.argmax(axis=1)
+        best[scores[np.arange(len(best)), best] == 0] = len(kb.illness_names)
+        results.extend(names[best].tolist())
+    return results
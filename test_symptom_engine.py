@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+
+import symptom_engine
+
+
+@pytest.fixture(scope="module")
+def kb():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "illnesses.json")) as f:
+        database = json.load(f)
+    return symptom_engine.build_knowledge_base(database)
+
+
+def extract(kb, text):
+    return kb.match(symptom_engine.WORD_PATTERN.findall(text.lower()))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I have a feaver", ["fever"]),
+    ("bad hedache since morning", ["headache"]),
+    ("sneezng all day", ["sneezing"]),
+    ("I have a headache and a cough", ["headache", "cough"]),
+    ("coughing and sneezes all night", ["cough", "sneezing"]),
+    ("I had the chills", ["chills"]),
+])
+def test_typos_are_corrected(kb, text, expected):
+    assert extract(kb, text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I fell asleep on the couch with a headache", ["headache"]),
+    ("fewer than two days", []),
+    ("the car tires are flat", []),
+    ("I tried ibuprofen", []),
+    ("I ate chilli", []),
+    ("I was chilling at home and got a headache", ["headache"]),
+    ("it is chilly outside", []),
+])
+def test_real_words_are_not_corrected(kb, text, expected):
+    assert extract(kb, text) == expected
+
+
+def test_common_words_are_never_corrected():
+    fuzzy = symptom_engine.FuzzyIndex(["chills"], 2, ["chilli"])
+    assert fuzzy.lookup("chilli") is None
+    assert fuzzy.lookup("chillz") == "chills"
+
+
+def test_typo_index_leaves_out_everyday_synonym_words(kb):
+    words = kb.fuzzy.words
+    assert {"fever", "headache", "sneezing", "queasy", "photophobia"} <= words
+    assert not words & {"tired", "feel", "sick", "head", "high", "want", "exhausted"}
+
+
+def test_ready_turns_true_once_extraction_is_built():
+    kb = symptom_engine.build_knowledge_base({"flu": ["fever", "chills"]})
+    assert not kb.ready()
+    kb.warm()
+    assert kb.ready()
+
+
+def test_full_warm_builds_every_scorer_table():
+    kb = symptom_engine.build_knowledge_base({"flu": ["fever", "chills"]}).warm(full=True)
+    assert kb._log_likelihoods is not None and kb._illness_masks is not None
+
+
+# Ten illnesses, nine of them listing fatigue; "a" lists both query symptoms, "j" only the rash
+def bayes_database():
+    database = {name: ["fatigue", f"symptom {name}"] for name in "abcdefghi"}
+    database["a"] = ["fatigue", "rash"]
+    database["j"] = ["rash"]
+    return database
+
+
+def test_bayes_prefers_the_more_complete_match():
+    kb = symptom_engine.build_knowledge_base(bayes_database())
+    assert kb.best_match_bayes(["fatigue", "rash"]) == "a"
+
+
+# A symptom added to the query moves every illness listing it up against every illness that does not
+def test_bayes_matching_another_symptom_never_hurts():
+    kb = symptom_engine.build_knowledge_base(bayes_database())
+    for query in (["rash"], ["fatigue"], ["symptom b"], ["fatigue", "symptom c"]):
+        before = kb.log_likelihood_scores(query)
+        for symptom in kb.vocabulary.keys() - set(query):
+            after = kb.log_likelihood_scores(query + [symptom])
+            listing = set(kb.postings[kb.vocabulary[symptom]])
+            for illness_id in listing & before.keys():
+                for other_id in before.keys() - listing:
+                    assert after[illness_id] - after[other_id] > before[illness_id] - before[other_id]